@@ -0,0 +1,34 @@
+'''Нагрузочные замеры лент yatube.
+
+Пакет запускается из корня репозитория:
+
+    python -m benchmarks generate --users 2000 --posts 50000
+    python -m benchmarks run --requests 200 --save
+    python -m benchmarks run --requests 200 --compare
+    python -m benchmarks sqlite --readers 4 --writers 2
+    python -m benchmarks urls
+
+Данные живут в отдельной базе (benchmarks/bench.sqlite3 по умолчанию),
+рабочая база проекта не затрагивается.'''
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BASE_DIR, 'yatube')
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE = os.path.join(BENCH_DIR, 'bench.sqlite3')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+def setup(database=DEFAULT_DATABASE):
+    '''Настраивает Django на отдельную базу для замеров'''
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+    settings.DEBUG = False
+    django.setup()
@@ -0,0 +1,100 @@
+import argparse
+import sys
+
+from . import DEFAULT_BASELINE, DEFAULT_DATABASE, setup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    generate = commands.add_parser('generate', help='Сгенерировать данные')
+    generate.add_argument('--users', type=int, default=500)
+    generate.add_argument('--groups', type=int, default=20)
+    generate.add_argument('--posts', type=int, default=10000)
+    generate.add_argument('--comments', type=int, default=20000)
+    generate.add_argument('--follows', type=int, default=10000)
+    generate.add_argument('--images', type=float, default=0.05,
+                          help='Доля постов с картинкой')
+    generate.add_argument('--seed', type=int, default=42)
+
+    run = commands.add_parser('run', help='Замерить ленты')
+    run.add_argument('--requests', type=int, default=100)
+    run.add_argument('--views', nargs='*', default=None)
+    run.add_argument('--cold', action='store_true',
+                     help='Очищать кэш перед каждым запросом')
+    run.add_argument('--baseline', default=DEFAULT_BASELINE)
+    run.add_argument('--save', action='store_true',
+                     help='Сохранить результат как базовый')
+    run.add_argument('--compare', action='store_true',
+                     help='Сравнить с базовым, код 1 при регрессии')
+    run.add_argument('--tolerance', type=float, default=0.2)
+    run.add_argument('--seed', type=int, default=42)
+
+    sqlite = commands.add_parser(
+        'sqlite', help='Конкурентные чтение и запись SQLite до и после '
+                       'настройки соединений'
+    )
+    sqlite.add_argument('--readers', type=int, default=4)
+    sqlite.add_argument('--writers', type=int, default=2)
+    sqlite.add_argument('--seconds', type=float, default=5)
+
+    urls = commands.add_parser(
+        'urls', help='Сравнить {% url %} и {% fasturl %}'
+    )
+    urls.add_argument('--iterations', type=int, default=10000)
+
+    args = parser.parse_args(argv)
+    setup(args.database)
+
+    if args.command == 'generate':
+        from .generate import generate
+        generate(
+            users=args.users,
+            groups=args.groups,
+            posts=args.posts,
+            comments=args.comments,
+            follows=args.follows,
+            images=args.images,
+            seed=args.seed,
+        )
+        return 0
+
+    if args.command == 'sqlite':
+        from . import sqlite
+        sqlite.report(sqlite.run(
+            readers=args.readers,
+            writers=args.writers,
+            seconds=args.seconds,
+        ))
+        return 0
+
+    if args.command == 'urls':
+        from . import urls
+        urls.report(urls.run(args.iterations))
+        return 0
+
+    from .runner import compare, load_baseline, report, run_all, save_baseline
+    results = run_all(
+        requests=args.requests,
+        views=args.views,
+        cold=args.cold,
+        seed=args.seed,
+    )
+    report(results)
+    if args.save:
+        save_baseline(results, args.baseline)
+    if args.compare:
+        regressions = compare(
+            results, load_baseline(args.baseline), args.tolerance
+        )
+        for line in regressions:
+            print(line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+'''Генератор данных для замеров.
+
+Пользователи и группы создаются через mixer, тексты - через Faker.
+Популярность авторов распределена по степенному закону: немногие
+авторы собирают большую часть подписок, постов и комментариев.
+Посты, подписки и комментарии пишутся bulk_create, после чего
+производные данные (счётчики, индекс поиска, ленты, копии картинок)
+строятся штатными командами.'''
+import os
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+from PIL import Image
+
+from posts.feed import backfill_feed
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import manual_dates
+
+BATCH_SIZE = 1000
+IMAGE_VARIANTS = 8
+IMAGE_SIZE = (1600, 1000)
+HISTORY_DAYS = 365
+ZIPF_EXPONENT = 1.1
+
+
+def popularity(count):
+    '''Веса по закону Ципфа для count элементов'''
+    return [1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(count)]
+
+
+def random_dates(rng, count):
+    now = timezone.now()
+    return sorted(
+        now - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))
+        for _ in range(count)
+    )
+
+
+def make_images(rng):
+    '''Несколько картинок в MEDIA_ROOT, общих для всех постов'''
+    names = []
+    for i in range(IMAGE_VARIANTS):
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        buffer = BytesIO()
+        Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+        name = f'posts/bench_{i}.jpg'
+        default_storage.delete(name)
+        content = ContentFile(buffer.getvalue())
+        names.append(default_storage.save(name, content))
+    return names
+
+
+def bulk(model, objects):
+    for start in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(
+            objects[start:start + BATCH_SIZE], ignore_conflicts=True
+        )
+
+
+def generate(users, groups, posts, comments, follows, images, seed):
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    call_command('migrate', verbosity=0)
+    call_command('flush', interactive=False, verbosity=0)
+
+    print(f'Пользователи: {users}, группы: {groups}')
+    people = mixer.cycle(users).blend(
+        User, username=mixer.sequence('bench_{0}')
+    )
+    communities = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('bench-group-{0}')
+    )
+    rng.shuffle(people)
+    weights = popularity(len(people))
+
+    print(f'Подписки: {follows}')
+    pairs = set()
+    for _ in range(follows):
+        user = rng.choice(people)
+        author = rng.choices(people, weights)[0]
+        if user != author:
+            pairs.add((user.pk, author.pk))
+    bulk(Follow, [Follow(user_id=u, author_id=a) for u, a in pairs])
+
+    print(f'Посты: {posts}')
+    pictures = make_images(rng) if images else []
+    authors = rng.choices(people, [w ** 0.5 for w in weights], k=posts)
+    with manual_dates():
+        bulk(Post, [
+            Post(
+                author=author,
+                group=rng.choice(communities) if rng.random() < 0.7 else None,
+                text=fake.paragraph(nb_sentences=rng.randint(1, 8)),
+                image=rng.choice(pictures) if rng.random() < images else '',
+                pub_date=date,
+            )
+            for author, date in zip(authors, random_dates(rng, posts))
+        ])
+
+        print(f'Комментарии: {comments}')
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        targets = rng.choices(post_ids, popularity(len(post_ids)), k=comments)
+        bulk(Comment, [
+            Comment(
+                post_id=post_id,
+                author=rng.choice(people),
+                text=fake.sentence(),
+                created=date,
+            )
+            for post_id, date in zip(targets, random_dates(rng, comments))
+        ])
+
+    print('Ленты, счётчики, индекс, копии картинок')
+    for user_id, author_id in pairs:
+        backfill_feed(user_id, author_id)
+    call_command('rebuild_user_stats', verbosity=0)
+    call_command('reindex', verbosity=0)
+    call_command('generate_renditions', verbosity=0)
+    print('Готово')
@@ -0,0 +1,164 @@
+'''Замеры лент: задержка p50/p95/p99, запросы к базе и пик памяти.
+
+Каждое представление вызывается через django.test.Client на случайных
+целях из сгенерированных данных. Задержка и число запросов меряются
+с выключенным tracemalloc, пик памяти - отдельным проходом по тем же
+адресам, потому что трассировка выделений заметно замедляет ответ.
+Результат можно сохранить как базовый JSON и сравнивать с ним
+следующие прогоны.'''
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(rank / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def scenarios(rng):
+    '''Генераторы адресов для каждого представления'''
+    slugs = list(Group.objects.values_list('slug', flat=True))
+    usernames = list(User.objects.values_list('username', flat=True)[:1000])
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+    readers = list(
+        User.objects.filter(pk__in=Follow.objects.values('user'))[:100]
+    )
+    return {
+        'index': (None, lambda: reverse('posts:index')),
+        'group_list': (None, lambda: reverse(
+            'posts:group_list', args=[rng.choice(slugs)]
+        )),
+        'profile': (None, lambda: reverse(
+            'posts:profile', args=[rng.choice(usernames)]
+        )),
+        'post_detail': (None, lambda: reverse(
+            'posts:post_detail', args=[rng.choice(post_ids)]
+        )),
+        'follow_index': (readers, lambda: reverse('posts:follow_index')),
+    }
+
+
+def check(url, response):
+    if response.status_code != 200:
+        raise RuntimeError(f'{url}: HTTP {response.status_code}')
+
+
+def measure(client, url, cold):
+    '''Задержка в миллисекундах и число запросов к базе'''
+    if cold:
+        cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+    check(url, response)
+    return elapsed * 1000, len(queries)
+
+
+def measure_memory(client, url, cold):
+    '''Пик памяти запроса в килобайтах, tracemalloc уже запущен'''
+    if cold:
+        cache.clear()
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+    response = client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    check(url, response)
+    return peak / 1024
+
+
+def run_view(name, users, make_url, requests, cold, rng):
+    client = Client()
+    targets = [
+        (rng.choice(users) if users else None, make_url())
+        for _ in range(requests)
+    ]
+    timings, query_counts = [], []
+    for user, url in targets:
+        if user is not None:
+            client.force_login(user)
+        elapsed, queries = measure(client, url, cold)
+        timings.append(elapsed)
+        query_counts.append(queries)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for user, url in targets:
+            if user is not None:
+                client.force_login(user)
+            peaks.append(measure_memory(client, url, cold))
+    finally:
+        tracemalloc.stop()
+    result = {
+        f'p{rank}_ms': round(percentile(timings, rank), 2)
+        for rank in PERCENTILES
+    }
+    result['queries'] = round(statistics.mean(query_counts), 2)
+    result['peak_kb'] = round(max(peaks), 1)
+    return result
+
+
+def run_all(requests, views=None, cold=False, seed=42):
+    setup_test_environment()
+    rng = random.Random(seed)
+    results = {}
+    for name, (users, make_url) in scenarios(rng).items():
+        if views and name not in views:
+            continue
+        if users is not None and not users:
+            continue
+        results[name] = run_view(name, users, make_url, requests, cold, rng)
+    return results
+
+
+def report(results):
+    columns = ['p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kb']
+    print(f'{"view":<14}' + ''.join(f'{c:>10}' for c in columns))
+    for name, values in results.items():
+        print(f'{name:<14}' + ''.join(f'{values[c]:>10}' for c in columns))
+
+
+def save_baseline(results, path):
+    with open(path, 'w') as baseline:
+        json.dump(results, baseline, indent=2, sort_keys=True)
+    print(f'Базовый замер сохранён в {path}')
+
+
+def load_baseline(path):
+    with open(path) as baseline:
+        return json.load(baseline)
+
+
+def compare(results, baseline, tolerance):
+    '''Регрессии относительно базового замера'''
+    regressions = []
+    for name, values in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p95_ms', 'p99_ms', 'peak_kb'):
+            if values[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {metric} {base[metric]} -> {values[metric]}'
+                )
+        if values['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: queries {base["queries"]} -> {values["queries"]}'
+            )
+    return regressions
@@ -0,0 +1,114 @@
+'''Конкурентное чтение и запись SQLite до и после настройки соединений.
+
+Читатели в цикле загружают первую страницу главной ленты, писатели
+публикуют посты со всеми сигналами (лента подписчиков, счётчики,
+поиск). Каждый режим работает на своей копии базы замеров: без
+настроек (журнал отката, как у SQLite по умолчанию) и с
+core.constants.SQLITE_PRAGMAS.'''
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from core.constants import SQLITE_PRAGMAS
+from posts.constants import LIMIT_COUNTS_POSTS
+from posts.models import Post, User
+
+MODES = (
+    ('default', {}),
+    ('tuned', SQLITE_PRAGMAS),
+)
+
+
+def copy_database(source, target, journal_mode):
+    '''Копирует базу замеров и переводит копию в нужный режим журнала'''
+    origin = sqlite3.connect(source)
+    copy = sqlite3.connect(target)
+    try:
+        origin.backup(copy)
+        copy.execute(f'PRAGMA journal_mode = {journal_mode}')
+    finally:
+        copy.close()
+        origin.close()
+
+
+def read(author_ids, index):
+    list(Post.objects.for_feed()[:LIMIT_COUNTS_POSTS])
+
+
+def write(author_ids, index):
+    Post.objects.create(
+        author_id=author_ids[index % len(author_ids)],
+        text=f'Пост замера конкурентной записи {index}',
+    )
+
+
+def worker(operation, author_ids, deadline, results):
+    connections.close_all()
+    done = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            operation(author_ids, done)
+            done += 1
+        except OperationalError:
+            errors += 1
+    connections.close_all()
+    results.put((operation.__name__, done, errors))
+
+
+def run_mode(pragmas, readers, writers, seconds):
+    settings.SQLITE_PRAGMAS = pragmas
+    author_ids = list(User.objects.values_list('pk', flat=True)[:100])
+    connections.close_all()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    deadline = time.monotonic() + seconds
+    processes = [
+        context.Process(
+            target=worker, args=(operation, author_ids, deadline, results)
+        )
+        for operation, count in ((read, readers), (write, writers))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    totals = {'read': [0, 0], 'write': [0, 0]}
+    for _ in processes:
+        name, done, errors = results.get()
+        totals[name][0] += done
+        totals[name][1] += errors
+    for process in processes:
+        process.join()
+    return {
+        'reads_per_s': round(totals['read'][0] / seconds, 1),
+        'writes_per_s': round(totals['write'][0] / seconds, 1),
+        'errors': totals['read'][1] + totals['write'][1],
+    }
+
+
+def run(readers=4, writers=2, seconds=5):
+    database = settings.DATABASES['default']['NAME']
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, pragmas in MODES:
+            copy = os.path.join(directory, f'{mode}.sqlite3')
+            copy_database(
+                database, copy, pragmas.get('journal_mode', 'DELETE')
+            )
+            connections.close_all()
+            settings.DATABASES['default']['NAME'] = copy
+            results[mode] = run_mode(pragmas, readers, writers, seconds)
+    settings.DATABASES['default']['NAME'] = database
+    return results
+
+
+def report(results):
+    columns = ('reads_per_s', 'writes_per_s', 'errors')
+    print(f'{"mode":<10}' + ''.join(f'{c:>14}' for c in columns))
+    for mode, values in results.items():
+        print(f'{mode:<10}' + ''.join(f'{values[c]:>14}' for c in columns))
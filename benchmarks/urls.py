@@ -0,0 +1,57 @@
+'''Микрозамер обращения URL: {% url %} и reverse() против {% fasturl %}.
+
+Шаблоны рисуют три ссылки карточки поста (профиль автора, пост,
+группа) для страницы из десяти постов, база не нужна.'''
+import timeit
+
+from django.template import engines
+from django.urls import reverse
+
+from core.urlcache import fast_reverse
+
+CARD_LINKS = (
+    "{{% for post in posts %}}"
+    "{{% {tag} 'posts:profile' post.username %}}"
+    "{{% {tag} 'posts:post_detail' post.id %}}"
+    "{{% {tag} 'posts:group_list' post.slug %}}"
+    "{{% endfor %}}"
+)
+POSTS = [
+    {'id': 1000 + i, 'username': f'author_{i}', 'slug': f'group-{i}'}
+    for i in range(10)
+]
+
+
+def _per_call(func, iterations):
+    '''Микросекунд на вызов, лучшее из пяти повторов'''
+    return min(timeit.repeat(func, number=iterations, repeat=5)) * (
+        1e6 / iterations
+    )
+
+
+def run(iterations):
+    engine = engines.all()[0]
+    url = engine.from_string(CARD_LINKS.format(tag='url'))
+    fast = engine.from_string(
+        '{% load fast_url %}' + CARD_LINKS.format(tag='fasturl')
+    )
+    context = {'posts': POSTS}
+    return {
+        'reverse': _per_call(
+            lambda: reverse('posts:profile', args=['author']), iterations
+        ),
+        'fast_reverse': _per_call(
+            lambda: fast_reverse('posts:profile', ['author']), iterations
+        ),
+        'template {% url %}': _per_call(
+            lambda: url.render(context), iterations // 10
+        ),
+        'template {% fasturl %}': _per_call(
+            lambda: fast.render(context), iterations // 10
+        ),
+    }
+
+
+def report(results):
+    for name, value in results.items():
+        print(f'{name:<26}{value:>10.2f} мкс')
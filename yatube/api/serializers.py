@@ -0,0 +1,27 @@
+'''Компактное представление моделей в JSON без шаблонов.'''
+from django.urls import reverse
+
+
+def serialize_post(post):
+    '''Пост ленты; ожидает посты из Post.objects.for_feed()'''
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'updated': post.updated,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'renditions': post.image_renditions,
+        'url': reverse('posts:post_detail', args=[post.pk]),
+    }
+
+
+def serialize_author(author, stats):
+    return {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class StaticApiTest(TestCase):
+    '''Класс для тестирования JSON API лент'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            for i in range(12)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_return_posts(self):
+        '''Все ленты отдают посты автора в JSON'''
+        urls = (
+            (self.guest_client, reverse('api:v1:posts')),
+            (self.guest_client, reverse(
+                'api:v1:group_posts', args=[self.group.slug]
+            )),
+            (self.guest_client, reverse(
+                'api:v1:profile', args=[self.author.username]
+            )),
+            (self.reader_client, reverse('api:v1:follow')),
+        )
+        for client, url in urls:
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(data['results'][0]['id'], self.posts[-1].pk)
+                self.assertEqual(data['results'][0]['author'], 'author')
+                self.assertEqual(data['results'][0]['group'], 'api-group')
+
+    def test_cursor_pagination(self):
+        '''Вторая страница доступна по ссылке next'''
+        data = self.guest_client.get(reverse('api:v1:posts')).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+
+        data = self.guest_client.get(data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[1].pk, self.posts[0].pk],
+        )
+        self.assertIsNone(data['next'])
+
+    def test_profile_contains_author(self):
+        data = self.guest_client.get(
+            reverse('api:v1:profile', args=[self.author.username])
+        ).json()
+        self.assertEqual(data['author']['posts_count'], 12)
+        self.assertEqual(data['author']['followers_count'], 1)
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        '''Повторный запрос с ETag получает 304 без запросов к постам'''
+        url = reverse('api:v1:posts')
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_edit_changes_etag(self):
+        '''Правка поста меняет ETag ленты группы'''
+        url = reverse('api:v1:group_posts', args=[self.group.slug])
+        etag = self.guest_client.get(url)['ETag']
+
+        post = self.posts[3]
+        post.text = 'Исправленный текст'
+        post.save()
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_requires_auth(self):
+        response = self.guest_client.get(reverse('api:v1:follow'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_unknown_group_is_404(self):
+        response = self.guest_client.get(
+            reverse('api:v1:group_posts', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
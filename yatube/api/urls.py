@@ -0,0 +1,16 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = 'api'
+
+v1_patterns = [
+    path('posts/', views.posts, name='posts'),
+    path('groups/<slug:slug>/posts/', views.group_feed, name='group_posts'),
+    path('profile/<str:username>/', views.profile, name='profile'),
+    path('follow/', views.follow, name='follow'),
+]
+
+urlpatterns = [
+    path('v1/', include((v1_patterns, 'v1'))),
+]
@@ -0,0 +1,122 @@
+'''JSON API лент версии 1.
+
+Ответы собираются без шаблонов, листаются курсором ?cursor= и
+поддерживают условные запросы: неизменившаяся лента отвечает 304
+по ETag или Last-Modified, не обращаясь к таблице постов.'''
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from posts.constants import CURSOR_PARAM, LIMIT_COUNTS_POSTS
+from posts.feed import FollowFeedPaginator, follow_feed
+from posts.freshness import (
+    all_posts,
+    author_posts,
+    feed_condition,
+    followed_posts,
+    group_posts,
+    load_author,
+    load_group,
+)
+from posts.models import Post
+from posts.stats import get_user_stats
+from posts.utils import CursorPaginator
+
+from .serializers import serialize_author, serialize_post
+
+
+def api_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def api_login_required(view):
+    '''Вместо перенаправления на форму входа отвечает 401'''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return api_response(
+                {'detail': 'Требуется авторизация'}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(
+        f'{request.path}?{CURSOR_PARAM}={cursor}'
+    )
+
+
+def feed_response(request, posts, paginator=None, **extra):
+    if paginator is None:
+        paginator = CursorPaginator(posts.for_feed(), LIMIT_COUNTS_POSTS)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return api_response({
+        **extra,
+        'results': [serialize_post(post) for post in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    })
+
+
+@require_safe
+@cache_control(no_cache=True)
+@feed_condition(all_posts)
+def posts(request):
+    '''Все посты'''
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@cache_control(no_cache=True)
+@feed_condition(group_posts)
+def group_feed(request, slug):
+    '''Посты группы'''
+    group = load_group(request, slug)
+    return feed_response(
+        request,
+        group.posts.all(),
+        group={
+            'slug': group.slug,
+            'title': group.title,
+            'description': group.description,
+        },
+    )
+
+
+@require_safe
+@cache_control(no_cache=True)
+@feed_condition(author_posts)
+def profile(request, username):
+    '''Автор, его счётчики и посты'''
+    author = load_author(request, username)
+    return feed_response(
+        request,
+        author.posts.all(),
+        author=serialize_author(author, get_user_stats(author)),
+    )
+
+
+@require_safe
+@api_login_required
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@feed_condition(followed_posts)
+def follow(request):
+    '''Лента подписок текущего пользователя'''
+    return feed_response(
+        request,
+        follow_feed(request.user),
+        paginator=FollowFeedPaginator(request.user, LIMIT_COUNTS_POSTS),
+    )
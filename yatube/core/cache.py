@@ -0,0 +1,102 @@
+'''Защита дорогих вычислений от одновременных промахов кэша.
+
+Когда ключ пропадает (истёк или сменилось поколение ленты), все
+запросы промахиваются разом и начинают считать одно и то же.
+get_or_compute пускает считать только один процесс: он берёт
+блокировку через cache.add(), а остальные недолго ждут появления
+готового значения. add() атомарен в redis, memcached и sqlite,
+для file - благодаря core.cache_backends.FileBasedCache. locmem
+живёт внутри процесса, и блокировка не видна другим процессам:
+каждый из них посчитает значение сам.
+
+get_or_refresh идёт дальше: значение хранится дольше своего срока
+свежести, и пока один процесс его пересчитывает, остальные отдают
+устаревшее. Сроки жизни получают случайный разброс, чтобы ключи,
+записанные одновременно, не истекали тоже одновременно. Значения
+считаются с основной базы (core.routers.primary_reads).'''
+import random
+import time
+
+from django.core.cache import cache
+
+from .constants import (
+    CACHE_LOCK_POLL,
+    CACHE_LOCK_TIMEOUT,
+    CACHE_LOCK_WAIT,
+    CACHE_STALE_TTL,
+    CACHE_TTL_JITTER,
+)
+from .routers import primary_reads
+
+MISSING = object()
+LOCK_KEY = '{}:lock'
+
+
+def jittered(timeout, spread=CACHE_TTL_JITTER):
+    '''Время жизни со случайным отклонением до spread в обе стороны'''
+    if timeout is None:
+        return None
+    return max(1, round(timeout * random.uniform(1 - spread, 1 + spread)))
+
+
+def wait_for(key, wait):
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(CACHE_LOCK_POLL)
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            return value
+    return MISSING
+
+
+def get_or_compute(key, compute, timeout, wait=CACHE_LOCK_WAIT):
+    '''Значение из кэша; при промахе его вычисляет один процесс.
+
+    Если блокировку держит другой процесс, ждём его результата не
+    дольше wait секунд, после чего считаем сами.'''
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        return value
+    lock = LOCK_KEY.format(key)
+    owner = cache.add(lock, 1, CACHE_LOCK_TIMEOUT)
+    if not owner:
+        value = wait_for(key, wait)
+        if value is not MISSING:
+            return value
+    try:
+        with primary_reads():
+            value = compute()
+        cache.set(key, value, jittered(timeout))
+    finally:
+        if owner:
+            cache.delete(lock)
+    return value
+
+
+def get_or_refresh(key, compute, timeout, version=None, wait=CACHE_LOCK_WAIT):
+    '''Значение, которое пересчитывает один процесс, пока остальные
+    отдают предыдущее.
+
+    Значение устаревает через timeout секунд (с разбросом) или при
+    смене version и хранится ещё CACHE_STALE_TTL секунд после этого.
+    Если значения нет совсем, ждём его как в get_or_compute.'''
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version and time.time() < entry[1]:
+        return entry[2]
+    lock = LOCK_KEY.format(key)
+    owner = cache.add(lock, 1, CACHE_LOCK_TIMEOUT)
+    if not owner:
+        if entry is None:
+            entry = wait_for(key, wait)
+        if entry is not MISSING:
+            return entry[2]
+    try:
+        with primary_reads():
+            value = compute()
+        fresh = jittered(timeout)
+        cache.set(key, (version, time.time() + fresh, value),
+                  fresh + CACHE_STALE_TTL)
+    finally:
+        if owner:
+            cache.delete(lock)
+    return value
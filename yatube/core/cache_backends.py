@@ -0,0 +1,51 @@
+'''Бэкенды кэша проекта.
+
+FileBasedCache Django реализует add() как has_key() и set(), поэтому
+два процесса могут одновременно решить, что ключа нет, и оба взять
+блокировку get_or_compute. Здесь проверка и запись ключа выполняются
+под файлом-замком, который создаётся атомарно (O_CREAT | O_EXCL).'''
+import os
+import time
+
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from .constants import FILE_CACHE_GUARD_STALE
+
+GUARD_SUFFIX = '.lock'
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    '''Файловый кэш с атомарным между процессами add()'''
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        guard = self._key_to_file(key, version) + GUARD_SUFFIX
+        try:
+            os.close(os.open(guard, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            self._drop_stale(guard)
+            return False
+        try:
+            if self.has_key(key, version):
+                return False
+            self.set(key, value, timeout, version)
+            return True
+        finally:
+            self._remove(guard)
+
+    def _drop_stale(self, guard):
+        '''Замок процесса, упавшего между проверкой и записью'''
+        try:
+            stale = time.time() - os.path.getmtime(guard)
+        except FileNotFoundError:
+            return
+        if stale > FILE_CACHE_GUARD_STALE:
+            self._remove(guard)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
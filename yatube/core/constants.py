@@ -0,0 +1,44 @@
+'''Константы очереди фоновых задач'''
+TASK_MAX_ATTEMPTS = 5
+TASK_VISIBILITY_TIMEOUT = 300
+TASK_RETRY_DELAY = 10
+TASK_CLAIM_BATCH = 10
+WORKER_IDLE_SLEEP = 1
+TASK_DONE_TTL = 60 * 60 * 24
+TASK_PRUNE_INTERVAL = 60
+
+'''Константы замеров запросов'''
+INSTRUMENTATION_SAMPLE_RATE = 1.0
+INSTRUMENTATION_WINDOW = 500
+INSTRUMENTATION_TEMPLATES = 5
+
+'''Константы маршрутизации чтения на реплики'''
+REPLICA_APPS = ('posts',)
+PRIMARY_PIN_COOKIE = 'pin_primary'
+PRIMARY_PIN_SECONDS = 5
+
+'''Настройки SQLite, применяемые к каждому новому соединению'''
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+'''Константы общего кэша'''
+CACHE_DB_ALIAS = 'cache'
+CACHE_APP_LABEL = 'django_cache'
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+CACHE_LOCK_POLL = 0.05
+CACHE_TTL_JITTER = 0.1
+CACHE_STALE_TTL = 60 * 60
+FILE_CACHE_GUARD_STALE = 5
+
+'''Константы кэша объектов: размер и срок жизни копии в процессе,
+срок жизни в общем кэше'''
+OBJECT_CACHE_SIZE = 1024
+OBJECT_CACHE_LOCAL_TTL = 5
+OBJECT_CACHE_TTL = 60 * 15
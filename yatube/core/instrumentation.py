@@ -0,0 +1,309 @@
+'''Замеры запросов: SQL, кэш, шаблоны и построение картинок.
+
+Метрики копятся в объекте Metrics текущего запроса (или задачи
+очереди), который хранится в contextvar. Источники данных:
+
+* SQL - execute_wrapper на всех соединениях на время запроса;
+* кэш - обёртка InstrumentedCache считает попадания и промахи;
+* шаблоны - бэкенд DjangoTemplates замеряет render() в целом и по
+  именам шаблонов;
+* картинки и прочие участки кода - контекстный менеджер timer().
+
+По завершении запрос попадает в агрегированную статистику процесса,
+которую показывает /internal/stats/.'''
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates as BaseBackend
+from django.template.backends.django import Template as BaseTemplate
+from django.template.backends.django import reraise
+from django.template.exceptions import TemplateDoesNotExist
+from django.utils.module_loading import import_string
+
+from .constants import (
+    INSTRUMENTATION_TEMPLATES,
+    INSTRUMENTATION_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('instrumentation_metrics', default=None)
+MISSING = object()
+
+
+class Metrics:
+    '''Метрики одного запроса или одной фоновой задачи'''
+
+    def __init__(self, label):
+        self.label = label
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = defaultdict(float)
+        self.templates = defaultdict(float)
+        self.running = set()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def finish(self):
+        self.duration = (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            'label': self.label,
+            'duration_ms': round(self.duration, 2),
+            'queries': self.queries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            **{
+                f'{name}_ms': round(value, 2)
+                for name, value in self.timings.items()
+            },
+            'templates_ms': {
+                name: round(value, 2)
+                for name, value in self.templates.items()
+            },
+        }
+
+    def server_timing(self):
+        '''Значение заголовка Server-Timing'''
+        parts = [
+            f'db;dur={self.timings["db"]:.1f};desc="{self.queries} queries"',
+            f'cache;desc="hit {self.cache_hits} miss {self.cache_misses}"',
+        ]
+        for name, value in sorted(self.timings.items()):
+            if name != 'db':
+                parts.append(f'{name};dur={value:.1f}')
+        parts.append(f'total;dur={self.duration:.1f}')
+        return ', '.join(parts)
+
+
+def current():
+    '''Метрики текущего запроса или None, если замер не идёт'''
+    return _current.get()
+
+
+@contextmanager
+def _measure(section, name):
+    metrics = current()
+    if metrics is None or (section, name) in metrics.running:
+        yield
+        return
+    metrics.running.add((section, name))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        getattr(metrics, section)[name] += elapsed
+        metrics.running.discard((section, name))
+
+
+def timer(name):
+    '''Добавляет время выполнения блока к метрике name.
+
+    Вложенные замеры с тем же именем не складываются повторно.'''
+    return _measure('timings', name)
+
+
+def template_timer(name):
+    '''Добавляет время отрисовки к шаблону name, вложенные шаблоны
+    учитываются и в своём имени, и в имени внешнего шаблона'''
+    return _measure('templates', name)
+
+
+def record_cache(hit):
+    metrics = current()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = current()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.timings['db'] += (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def collect(label):
+    '''Собирает метрики блока и передаёт их в статистику процесса'''
+    metrics = Metrics(label)
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_query_wrapper)
+                )
+            yield metrics
+    finally:
+        _current.reset(token)
+        metrics.finish()
+        stats.record(metrics)
+        logger.info(json.dumps(metrics.as_dict(), ensure_ascii=False))
+
+
+def _percentile(values, rank):
+    ordered = sorted(values)
+    index = round(rank / 100 * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, index))]
+
+
+class Stats:
+    '''Агрегированные метрики по представлениям в пределах процесса'''
+
+    def __init__(self, window=INSTRUMENTATION_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(lambda: defaultdict(float))
+        self.templates = defaultdict(lambda: defaultdict(float))
+        self.durations = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, metrics):
+        with self.lock:
+            totals = self.totals[metrics.label]
+            totals['count'] += 1
+            totals['duration'] += metrics.duration
+            totals['queries'] += metrics.queries
+            totals['cache_hits'] += metrics.cache_hits
+            totals['cache_misses'] += metrics.cache_misses
+            for name, value in metrics.timings.items():
+                totals[name] += value
+            for name, value in metrics.templates.items():
+                self.templates[metrics.label][name] += value
+            self.durations[metrics.label].append(metrics.duration)
+
+    def snapshot(self):
+        '''Строки статистики, самые затратные представления сверху'''
+        with self.lock:
+            rows = []
+            for label, totals in self.totals.items():
+                count = totals['count']
+                lookups = totals['cache_hits'] + totals['cache_misses']
+                durations = self.durations[label]
+                rows.append({
+                    'label': label,
+                    'count': int(count),
+                    'total_ms': round(totals['duration'], 1),
+                    'avg_ms': round(totals['duration'] / count, 2),
+                    'p95_ms': round(_percentile(durations, 95), 2),
+                    'max_ms': round(max(durations), 2),
+                    'queries': round(totals['queries'] / count, 2),
+                    'db_ms': round(totals['db'] / count, 2),
+                    'cache_hit_rate': (
+                        round(totals['cache_hits'] / lookups, 3)
+                        if lookups else None
+                    ),
+                    'template_ms': round(totals['template'] / count, 2),
+                    'thumbnail_ms': round(totals['thumbnail'] / count, 2),
+                    'templates': self._templates(label, count),
+                })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def _templates(self, label, count):
+        '''Среднее время отрисовки шаблонов, самые медленные сверху'''
+        templates = sorted(
+            self.templates[label].items(),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return [
+            {'name': name, 'avg_ms': round(total / count, 2)}
+            for name, total in templates[:INSTRUMENTATION_TEMPLATES]
+        ]
+
+
+stats = Stats()
+
+
+class InstrumentedCacheMixin:
+    '''Считает попадания и промахи только во внешнем вызове: бэкенды
+    реализуют get() через get_many() и наоборот'''
+
+    _recording = False
+
+    def get(self, key, default=None, version=None):
+        if self._recording:
+            return super().get(key, default, version)
+        self._recording = True
+        try:
+            value = super().get(key, MISSING, version)
+        finally:
+            self._recording = False
+        record_cache(value is not MISSING)
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        if self._recording:
+            return super().get_many(keys, version)
+        self._recording = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            self._recording = False
+        for key in keys:
+            record_cache(key in found)
+        return found
+
+
+@lru_cache(maxsize=None)
+def instrumented_backend(path):
+    backend = import_string(path)
+    return type(
+        f'Instrumented{backend.__name__}',
+        (InstrumentedCacheMixin, backend),
+        {},
+    )
+
+
+class InstrumentedCache:
+    '''Любой бэкенд кэша с подсчётом попаданий и промахов.
+
+    Настоящий бэкенд задаётся ключом WRAPPED_BACKEND в настройках
+    CACHES, создаётся его подкласс, поэтому проверки isinstance()
+    (например, в createcachetable) продолжают работать.'''
+
+    def __new__(cls, location, params):
+        params = dict(params)
+        backend = instrumented_backend(params.pop('WRAPPED_BACKEND'))
+        return backend(location, params)
+
+
+class Template(BaseTemplate):
+
+    def render(self, context=None, request=None):
+        with timer('template'), template_timer(self.template.name):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseBackend):
+    '''Бэкенд шаблонов Django с замером времени отрисовки'''
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,60 @@
+import base64
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    '''Почтовый бэкенд, который только ставит письма в очередь.
+
+    Настоящую отправку выполняет воркер через QUEUED_EMAIL_BACKEND.
+    Вложения передаются в base64, готовые MIME-части не поддерживаются.'''
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            deliver_email.delay({
+                'subject': message.subject,
+                'body': message.body,
+                'from_email': message.from_email,
+                'to': message.to,
+                'cc': message.cc,
+                'bcc': message.bcc,
+                'reply_to': message.reply_to,
+                'headers': message.extra_headers,
+                'alternatives': getattr(message, 'alternatives', []),
+                'attachments': [
+                    encode_attachment(attachment)
+                    for attachment in message.attachments
+                ],
+            })
+        return len(email_messages)
+
+
+def encode_attachment(attachment):
+    '''Вложение (имя, содержимое, тип) в виде, пригодном для JSON'''
+    if isinstance(attachment, MIMEBase):
+        raise ValueError('MIME-вложения нельзя поставить в очередь')
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode()
+    return [filename, base64.b64encode(content).decode('ascii'), mimetype]
+
+
+@task
+def deliver_email(message):
+    '''Отправляет письмо из очереди настоящим бэкендом'''
+    alternatives = message.pop('alternatives')
+    attachments = message.pop('attachments', [])
+    email = EmailMultiAlternatives(
+        connection=get_connection(settings.QUEUED_EMAIL_BACKEND),
+        **message,
+    )
+    for content, mimetype in alternatives:
+        email.attach_alternative(content, mimetype)
+    for filename, content, mimetype in attachments:
+        email.attach(filename, base64.b64decode(content), mimetype)
+    email.send()
@@ -0,0 +1,84 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.constants import (
+    TASK_PRUNE_INTERVAL,
+    TASK_VISIBILITY_TIMEOUT,
+    WORKER_IDLE_SLEEP,
+)
+from core.tasks import claim_job, prune_jobs, run_job
+
+
+def work(burst, sleep, visibility_timeout):
+    '''Цикл одного воркера: захватить задачу, выполнить, повторить.
+
+    Пока очередь пуста, воркер не чаще TASK_PRUNE_INTERVAL удаляет
+    старые выполненные задачи.'''
+    pruned = 0
+    while True:
+        job = claim_job(visibility_timeout)
+        if job is not None:
+            run_job(job)
+            continue
+        if time.monotonic() - pruned >= TASK_PRUNE_INTERVAL:
+            prune_jobs()
+            pruned = time.monotonic()
+        if burst:
+            return
+        time.sleep(sleep)
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Количество процессов-воркеров',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=WORKER_IDLE_SLEEP,
+            help='Пауза между опросами пустой очереди, секунд',
+        )
+        parser.add_argument(
+            '--visibility-timeout',
+            type=int,
+            default=TASK_VISIBILITY_TIMEOUT,
+            help='Через сколько секунд задача упавшего воркера вернётся',
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options['burst'],
+            options['sleep'],
+            options['visibility_timeout'],
+        )
+        if options['processes'] <= 1:
+            work(*worker_args)
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=work, args=worker_args)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
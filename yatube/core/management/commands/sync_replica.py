@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в имитацию реплики '
+        '(DB_REPLICA=sqlite), заменяя асинхронную репликацию'
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = [
+            settings.DATABASES[alias] for alias in settings.DATABASE_REPLICAS
+        ]
+        engine = 'django.db.backends.sqlite3'
+        if primary['ENGINE'] != engine or not replicas:
+            raise CommandError('Имитация реплики работает только с SQLite')
+        source = sqlite3.connect(primary['NAME'])
+        try:
+            for replica in replicas:
+                target = sqlite3.connect(replica['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'Реплика {replica["NAME"]} обновлена')
+        finally:
+            source.close()
@@ -0,0 +1,67 @@
+import random
+
+from django.conf import settings
+
+from . import instrumentation
+from .constants import (
+    INSTRUMENTATION_SAMPLE_RATE,
+    PRIMARY_PIN_COOKIE,
+    PRIMARY_PIN_SECONDS,
+)
+from .routers import routing
+
+
+class InstrumentationMiddleware:
+    '''Замеряет выборку запросов и отдаёт метрики в Server-Timing.
+
+    Доля замеряемых запросов задаётся INSTRUMENTATION_SAMPLE_RATE,
+    заголовок Server-Timing видят только сотрудники или режим DEBUG.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(
+            settings, 'INSTRUMENTATION_SAMPLE_RATE',
+            INSTRUMENTATION_SAMPLE_RATE,
+        )
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        with instrumentation.collect('unresolved') as metrics:
+            response = self.get_response(request)
+            match = getattr(request, 'resolver_match', None)
+            if match is not None:
+                metrics.label = match.view_name
+        if settings.DEBUG or self.is_staff(request):
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    @staticmethod
+    def is_staff(request):
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+
+class PrimaryPinningMiddleware:
+    '''Закрепляет за основной базой небезопасные запросы и запросы
+    клиента, который только что что-то записал'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or PRIMARY_PIN_COOKIE in request.COOKIES
+        )
+        with routing(pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                '1',
+                max_age=PRIMARY_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,70 @@
+from django.db import models
+from django.utils import timezone
+
+from .constants import TASK_MAX_ATTEMPTS
+
+
+class Job(models.Model):
+    '''Фоновая задача в очереди на базе данных'''
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=255,
+    )
+    payload = models.TextField(
+        verbose_name='Аргументы',
+        default='{}',
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=TASK_MAX_ATTEMPTS,
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Не раньше',
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занята до',
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        ordering = ('run_after', 'id')
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'], name='job_status_run_after_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,171 @@
+'''Кэш объектов моделей для точечных выборок по id, slug, username.
+
+Чтение идёт сквозь два уровня: небольшой LRU в памяти процесса
+и общий кэш Django, при промахе объект берётся из базы. Объект
+хранится под своим pk, а поиск по другому уникальному полю идёт
+через ключ-ссылку «значение -> pk», так что копия объекта в кэше
+одна. Ссылка проверяется по полю найденного объекта и после
+переименования просто перестаёт совпадать.
+
+Сброс вызывают сигналы post_save и post_delete, вместе с объектом
+сбрасываются ссылки на его значения полей. Сброс повторяется после
+коммита транзакции: до него другой процесс ещё читает старую строку
+и мог снова положить её в кэш. В своём процессе сброс мгновенный,
+копии в памяти других процессов живут не дольше
+OBJECT_CACHE_LOCAL_TTL секунд. Каждый вызов get() возвращает
+отдельную копию объекта, поэтому её можно менять и сохранять.
+
+Если задан fields, из базы читаются и кэшируются только эти поля
+(и поля ссылок), остальные догружаются при обращении. Так в общий
+кэш не попадают, например, хэши паролей пользователей.'''
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from .constants import (
+    OBJECT_CACHE_LOCAL_TTL,
+    OBJECT_CACHE_SIZE,
+    OBJECT_CACHE_TTL,
+)
+from .routers import primary_reads
+
+MISSING = object()
+OBJECT_KEY = 'object:{}:{}'
+ALIAS_KEY = 'object:{}:{}:{}'
+
+
+class LocalCache:
+    '''LRU ограниченного размера со сроком жизни записей'''
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ObjectCache:
+    '''Сквозной кэш объектов model по pk и полям aliases'''
+
+    def __init__(self, model, aliases=(), fields=None, size=OBJECT_CACHE_SIZE,
+                 local_ttl=OBJECT_CACHE_LOCAL_TTL, timeout=OBJECT_CACHE_TTL):
+        self.model = model
+        self.aliases = aliases
+        self.fields = fields and (*fields, *aliases)
+        self.timeout = timeout
+        self.label = model._meta.label_lower
+        self.local = LocalCache(size, local_ttl)
+
+    def _read(self, key):
+        value = self.local.get(key)
+        if value is MISSING:
+            value = cache.get(key, MISSING)
+            if value is not MISSING:
+                self.local.set(key, value)
+        return value
+
+    def _write(self, key, value):
+        cache.set(key, value, self.timeout)
+        self.local.set(key, value)
+
+    def _store(self, obj):
+        key = OBJECT_KEY.format(self.label, obj.pk)
+        self._write(key, pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+    def get(self, **lookup):
+        '''Объект по одному полю: get(pk=1), get(slug='cats').
+
+        Отсутствующий объект - исключение model.DoesNotExist.'''
+        (field, value), = lookup.items()
+        if field == 'pk':
+            return self._get_by_pk(value)
+        if field not in self.aliases:
+            raise ValueError(f'{self.label}: нет ссылок по полю {field}')
+        key = ALIAS_KEY.format(self.label, field, value)
+        pk = self._read(key)
+        if pk is not MISSING:
+            try:
+                obj = self._get_by_pk(pk)
+            except self.model.DoesNotExist:
+                obj = None
+            if obj is not None and getattr(obj, field) == value:
+                return obj
+        obj = self._fetch(**lookup)
+        self._store(obj)
+        self._write(key, obj.pk)
+        return obj
+
+    def _fetch(self, **lookup):
+        queryset = self.model.objects.all()
+        if self.fields:
+            queryset = queryset.only(*self.fields)
+        with primary_reads():
+            return queryset.get(**lookup)
+
+    def _get_by_pk(self, pk):
+        data = self._read(OBJECT_KEY.format(self.label, pk))
+        if data is not MISSING:
+            return pickle.loads(data)
+        obj = self._fetch(pk=pk)
+        self._store(obj)
+        return obj
+
+    def invalidate(self, obj):
+        '''Сбрасывает объект и ссылки на его текущие значения полей
+        в общем кэше и в памяти процесса'''
+        keys = [OBJECT_KEY.format(self.label, obj.pk)]
+        keys.extend(
+            ALIAS_KEY.format(self.label, field, getattr(obj, field))
+            for field in self.aliases
+        )
+        cache.delete_many(keys)
+        for key in keys:
+            self.local.delete(key)
+
+    def invalidate_on_commit(self, obj):
+        '''invalidate() сейчас и ещё раз после коммита транзакции'''
+        self.invalidate(obj)
+        transaction.on_commit(lambda: self.invalidate(obj))
+
+
+def get_cached_or_404(object_cache, **lookup):
+    '''get_object_or_404() через кэш объектов'''
+    try:
+        return object_cache.get(**lookup)
+    except object_cache.model.DoesNotExist:
+        raise Http404(
+            f'No {object_cache.model._meta.object_name} matches the '
+            'given query.'
+        )
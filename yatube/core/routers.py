@@ -0,0 +1,115 @@
+'''Маршрутизация запросов к основной базе и репликам.
+
+Чтение моделей лент (REPLICA_APPS) внутри HTTP-запроса уходит на
+реплику из settings.DATABASE_REPLICAS, одну на весь запрос, чтобы
+его выборки не расходились из-за разного отставания реплик. Запись
+и всё остальное - на основную базу. После первой записи запрос до конца
+читает с основной базы, а PrimaryPinningMiddleware ещё несколько
+секунд направляет туда следующие запросы того же клиента, чтобы он
+увидел свою запись несмотря на отставание реплик. Фоновые задачи и
+команды работают вне запроса и всегда читают с основной базы.
+
+Значения для общего кэша считаются внутри primary_reads(): иначе
+отстающая реплика сразу после смены поколения записала бы в кэш
+старую страницу под новым поколением для всех читателей.
+
+Таблица кэша DatabaseCache живёт в отдельной базе CACHE_DB_ALIAS,
+если она настроена, чтобы запись в кэш не блокировала основную.'''
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .constants import CACHE_APP_LABEL, CACHE_DB_ALIAS, REPLICA_APPS
+
+_state = ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+    '''Состояние маршрутизации текущего запроса'''
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+    def choose_replica(self):
+        if self.replica is None:
+            self.replica = random.choice(replicas())
+        return self.replica
+
+
+@contextmanager
+def routing(pinned=False):
+    '''Разрешает чтение с реплик внутри блока, если он не закреплён
+    за основной базой'''
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    '''Чтение внутри блока идёт с основной базы'''
+    state = _state.get()
+    if state is None or state.pinned:
+        yield
+        return
+    state.pinned = True
+    try:
+        yield
+    finally:
+        state.pinned = state.wrote
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def cache_database(model):
+    if model._meta.app_label != CACHE_APP_LABEL:
+        return None
+    if CACHE_DB_ALIAS in settings.DATABASES:
+        return CACHE_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        database = cache_database(model)
+        if database is not None:
+            return database
+        state = _state.get()
+        if state is None or state.pinned or not replicas():
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label not in REPLICA_APPS:
+            return DEFAULT_DB_ALIAS
+        return state.choose_replica()
+
+    def db_for_write(self, model, **hints):
+        database = cache_database(model)
+        if database is not None:
+            return database
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        '''Реплики содержат те же данные, что и основная база'''
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        '''Схема попадает на реплики репликацией, в базе кэша
+        живёт только таблица кэша'''
+        if db in replicas():
+            return False
+        if db == CACHE_DB_ALIAS:
+            return app_label == CACHE_APP_LABEL
+        return None
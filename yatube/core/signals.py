@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .constants import SQLITE_PRAGMAS
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    '''WAL и остальные настройки SQLite для каждого соединения.
+
+    В режиме WAL чтение не ждёт записи, а synchronous=NORMAL
+    синхронизирует диск только при контрольных точках журнала.
+    Набор задаётся settings.SQLITE_PRAGMAS, пустой словарь
+    оставляет настройки SQLite по умолчанию.'''
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
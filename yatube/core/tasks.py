@@ -0,0 +1,127 @@
+'''Лёгкая очередь фоновых задач на базе данных.
+
+Задача - обычная функция, помеченная @task. Вызов func.delay(...)
+записывает её в таблицу Job в текущей транзакции, поэтому воркер
+увидит задачу только после коммита. Воркер (manage.py runworker)
+захватывает задачу атомарным UPDATE с таймаутом видимости: если он
+упадёт, задача снова станет доступна после locked_until. Выполненные
+задачи хранятся TASK_DONE_TTL и удаляются простаивающим воркером.'''
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .constants import (
+    TASK_CLAIM_BATCH,
+    TASK_DONE_TTL,
+    TASK_MAX_ATTEMPTS,
+    TASK_RETRY_DELAY,
+    TASK_VISIBILITY_TIMEOUT,
+)
+from .instrumentation import collect
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(func=None, *, max_attempts=TASK_MAX_ATTEMPTS):
+    '''Помечает функцию как фоновую задачу и добавляет ей .delay()'''
+    def decorate(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, max_attempts=max_attempts)
+
+        func.task_name = name
+        func.delay = delay
+        return func
+
+    if func is None:
+        return decorate
+    return decorate(func)
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=TASK_MAX_ATTEMPTS):
+    '''Ставит задачу в очередь, аргументы должны сериализоваться в JSON'''
+    return Job.objects.create(
+        name=name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+        max_attempts=max_attempts,
+    )
+
+
+def claim_job(visibility_timeout=TASK_VISIBILITY_TIMEOUT):
+    '''Захватывает одну готовую задачу или возвращает None'''
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        status__in=(Job.QUEUED, Job.RUNNING),
+        run_after__lte=now,
+    ).values_list('pk', 'attempts')[:TASK_CLAIM_BATCH]
+    for pk, attempts in candidates:
+        claimed = Job.objects.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+            pk=pk,
+            attempts=attempts,
+        ).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    '''Выполняет захваченную задачу, при ошибке планирует повтор'''
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Превышено число попыток')
+        payload = json.loads(job.payload)
+        with collect(f'task:{job.name}'):
+            import_string(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception(
+            'Задача %s (%s) завершилась ошибкой', job.pk, job.name
+        )
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, locked_until=None, last_error=error,
+            )
+        else:
+            delay = TASK_RETRY_DELAY * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED,
+                locked_until=None,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                last_error=error,
+            )
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, locked_until=None)
+    return True
+
+
+def prune_jobs(ttl=TASK_DONE_TTL):
+    '''Удаляет выполненные задачи старше ttl секунд'''
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, run_after__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def run_pending(visibility_timeout=TASK_VISIBILITY_TIMEOUT):
+    '''Выполняет все готовые задачи в текущем процессе'''
+    done = 0
+    job = claim_job(visibility_timeout)
+    while job is not None:
+        run_job(job)
+        done += 1
+        job = claim_job(visibility_timeout)
+    return done
@@ -0,0 +1,60 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache import get_or_refresh
+
+register = template.Library()
+
+
+class FragmentCacheNode(CacheNode):
+    '''{% cache %}, фрагмент которого после устаревания перерисовывает
+    один процесс, пока остальные отдают предыдущую версию'''
+
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on,
+                 version):
+        super().__init__(
+            nodelist, expire_time_var, fragment_name, vary_on, None
+        )
+        self.version = version
+
+    def render(self, context):
+        timeout = self.expire_time_var.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        version = self.version.resolve(context) if self.version else None
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_refresh(
+            key,
+            lambda: self.nodelist.render(context),
+            timeout,
+            version=version,
+        )
+
+
+@register.tag('fragmentcache')
+def do_fragment_cache(parser, token):
+    '''{% fragmentcache ttl имя [переменные ...] [version=версия] %}
+    ... {% endfragmentcache %}
+
+    Смена версии не меняет ключ: устаревший фрагмент отдаётся, пока
+    один запрос рисует новый. Поэтому version= подходит только
+    страницам, где запоздание допустимо (главная); ленты, которые автор
+    открывает сразу после записи, держат версию в ключе среди
+    переменных и после её смены всегда рисуются заново.'''
+    nodelist = parser.parse(('endfragmentcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    version = None
+    if tokens[-1].startswith('version='):
+        version = parser.compile_filter(tokens.pop()[len('version='):])
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]} ожидает время жизни и имя фрагмента'
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        version,
+    )
@@ -0,0 +1,50 @@
+from django import template
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts.cache import labels_version
+from posts.constants import POST_CARD_CACHE_TTL, POST_CARD_TEMPLATE
+
+register = template.Library()
+
+
+def card_key(post, group, author, labels):
+    '''Карточка зависит от поста и от названия группы и имени автора,
+    изменение которых меняет поколение подписей labels'''
+    return make_template_fragment_key('post_card', [
+        post.pk,
+        post.updated.isoformat(),
+        getattr(group, 'pk', ''),
+        getattr(author, 'pk', ''),
+        labels,
+    ])
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    '''{% post_cards page_obj as cards %} - отрисованные карточки постов.
+
+    Готовые карточки страницы берутся из кэша одним get_many,
+    недостающие рисуются один раз загруженным шаблоном и сохраняются
+    одним set_many.'''
+    group = context.get('group')
+    author = context.get('author')
+    labels = labels_version()
+    keys = {card_key(post, group, author, labels): post for post in posts}
+    cards = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in cards]
+    if missing:
+        card = get_template(POST_CARD_TEMPLATE)
+        rendered = {
+            key: card.render(
+                {'post': keys[key], 'group': group, 'author': author}
+            )
+            for key in missing
+        }
+        cache.set_many(
+            rendered, context.get('post_card_ttl', POST_CARD_CACHE_TTL)
+        )
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
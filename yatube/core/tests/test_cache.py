@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from ..cache import LOCK_KEY, get_or_compute, get_or_refresh, jittered
+from ..cache_backends import GUARD_SUFFIX
+from ..cache_backends import FileBasedCache as AtomicFileBasedCache
+from ..instrumentation import InstrumentedCache, collect
+
+
+class InstrumentedCacheTest(SimpleTestCase):
+    '''Класс для тестирования обёртки бэкендов кэша'''
+
+    def test_wraps_any_backend(self):
+        '''Обёртка остаётся экземпляром настоящего бэкенда
+        и считает попадания и промахи'''
+        with tempfile.TemporaryDirectory() as directory:
+            backend = InstrumentedCache(directory, {
+                'WRAPPED_BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+            })
+            self.assertIsInstance(backend, FileBasedCache)
+            with collect('test') as metrics:
+                backend.set('key', 'value')
+                self.assertEqual(backend.get('key'), 'value')
+                self.assertIsNone(backend.get('missing'))
+                backend.get_many(['key', 'missing'])
+
+        self.assertEqual(metrics.cache_hits, 2)
+        self.assertEqual(metrics.cache_misses, 2)
+
+
+class AtomicFileBasedCacheTest(SimpleTestCase):
+    '''Класс для тестирования атомарного add() файлового кэша'''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = AtomicFileBasedCache(directory.name, {})
+
+    def test_add_only_once(self):
+        self.assertTrue(self.backend.add('lock', 1))
+        self.assertFalse(self.backend.add('lock', 2))
+        self.assertEqual(self.backend.get('lock'), 1)
+
+    def test_add_respects_guard(self):
+        '''Пока другой процесс держит замок ключа, add() не проходит,
+        брошенный замок убирается'''
+        guard = self.backend._key_to_file('lock') + GUARD_SUFFIX
+        open(guard, 'w').close()
+
+        self.assertFalse(self.backend.add('lock', 1))
+        self.assertTrue(os.path.exists(guard))
+
+        old = time.time() - 60
+        os.utime(guard, (old, old))
+        self.assertFalse(self.backend.add('lock', 1))
+        self.assertTrue(self.backend.add('lock', 1))
+
+
+class GetOrComputeTest(SimpleTestCase):
+    '''Класс для тестирования защиты от одновременных промахов'''
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return 'значение'
+
+    def test_computes_once(self):
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'значение')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'значение')
+
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(cache.get(LOCK_KEY.format('key')))
+
+    def test_waits_for_lock_owner(self):
+        '''Пока блокировку держит другой процесс, значение не считается,
+        а по истечении ожидания считается без снятия чужой блокировки'''
+        cache.add(LOCK_KEY.format('key'), 1)
+
+        value = get_or_compute('key', self.compute, 60, wait=0.1)
+
+        self.assertEqual(value, 'значение')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.get(LOCK_KEY.format('key')), 1)
+
+
+class GetOrRefreshTest(SimpleTestCase):
+    '''Класс для тестирования одиночной перегенерации'''
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_new_version_is_recomputed(self):
+        self.assertEqual(get_or_refresh('key', self.compute, 60, 1), 1)
+        self.assertEqual(get_or_refresh('key', self.compute, 60, 1), 1)
+        self.assertEqual(get_or_refresh('key', self.compute, 60, 2), 2)
+
+    def test_stale_value_served_during_refresh(self):
+        '''Пока другой процесс пересчитывает значение,
+        отдаётся предыдущее'''
+        get_or_refresh('key', self.compute, 60, 1)
+        cache.add(LOCK_KEY.format('key'), 1)
+
+        self.assertEqual(get_or_refresh('key', self.compute, 60, 2), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_ttl_is_jittered(self):
+        ttls = {jittered(100) for _ in range(50)}
+        self.assertGreater(len(ttls), 1)
+        self.assertTrue(all(90 <= ttl <= 110 for ttl in ttls))
+
+    def test_fragment_tag(self):
+        '''{% fragmentcache %} отдаёт фрагмент из кэша, пока не сменится
+        версия'''
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% fragmentcache 60 fragment version=version %}{{ name }}'
+            '{% endfragmentcache %}'
+        )
+
+        def render(name, version):
+            return template.render(Context({'name': name, 'version': version}))
+
+        self.assertEqual(render('а', 1), 'а')
+        self.assertEqual(render('б', 1), 'а')
+        self.assertEqual(render('в', 2), 'в')
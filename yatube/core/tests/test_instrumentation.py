@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..instrumentation import stats
+
+User = get_user_model()
+
+
+class InstrumentationTest(TestCase):
+    '''Класс для тестирования замеров запросов'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.author, text='Пост для замеров')
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def row(self, label):
+        return next(
+            row for row in stats.snapshot() if row['label'] == label
+        )
+
+    def test_request_metrics_are_aggregated(self):
+        '''Запрос попадает в статистику с SQL, кэшем и шаблонами'''
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+
+        row = self.row('posts:index')
+        self.assertEqual(row['count'], 2)
+        self.assertGreater(row['queries'], 0)
+        self.assertGreater(row['template_ms'], 0)
+        self.assertGreater(row['cache_hit_rate'], 0)
+        templates = [template['name'] for template in row['templates']]
+        self.assertIn('posts/index.html', templates)
+
+    def test_server_timing_only_for_staff(self):
+        '''Заголовок Server-Timing видят только сотрудники'''
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+        response = self.staff_client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_can_be_disabled(self):
+        '''При нулевой доле выборки запросы не замеряются'''
+        response = self.staff_client.get(reverse('posts:index'))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(stats.snapshot(), [])
+
+    def test_stats_view_is_staff_only(self):
+        '''Страница статистики доступна только сотрудникам'''
+        url = reverse('core:stats')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+        self.staff_client.get(reverse('posts:index'))
+        response = self.staff_client.get(url, {'format': 'json'})
+        labels = [row['label'] for row in response.json()['views']]
+        self.assertIn('posts:index', labels)
+
+        response = self.staff_client.post(reverse('core:stats_reset'))
+        self.assertRedirects(response, url)
+        labels = [row['label'] for row in stats.snapshot()]
+        self.assertNotIn('posts:index', labels)
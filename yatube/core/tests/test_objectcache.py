@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.models import Group, User
+
+from ..objectcache import MISSING, OBJECT_KEY, LocalCache, ObjectCache
+
+
+class LocalCacheTest(TestCase):
+    '''Класс для тестирования LRU в памяти процесса'''
+
+    def test_evicts_least_recently_used(self):
+        local = LocalCache(size=2, ttl=60)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+
+        self.assertEqual(local.get('a'), 1)
+        self.assertIs(local.get('b'), MISSING)
+        self.assertEqual(local.get('c'), 3)
+
+    def test_entries_expire(self):
+        local = LocalCache(size=2, ttl=5)
+        with mock.patch('core.objectcache.time.monotonic', return_value=0):
+            local.set('a', 1)
+        with mock.patch('core.objectcache.time.monotonic', return_value=6):
+            self.assertIs(local.get('a'), MISSING)
+
+
+class ObjectCacheTest(TestCase):
+    '''Класс для тестирования кэша объектов'''
+
+    def setUp(self):
+        cache.clear()
+        self.groups = ObjectCache(Group, aliases=('slug',))
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def test_read_through(self):
+        '''Повторная выборка по pk и по ссылке не идёт в базу'''
+        with self.assertNumQueries(1):
+            self.groups.get(slug='test-slug')
+        with self.assertNumQueries(0):
+            by_slug = self.groups.get(slug='test-slug')
+            by_pk = self.groups.get(pk=self.group.pk)
+
+        self.assertEqual(by_slug, self.group)
+        self.assertIsNot(by_slug, by_pk)
+
+    def test_shared_cache_fills_local(self):
+        '''Другой процесс находит объект в общем кэше'''
+        self.groups.get(slug='test-slug')
+        other = ObjectCache(Group, aliases=('slug',))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(other.get(slug='test-slug'), self.group)
+
+    def test_invalidate_and_rename(self):
+        '''После сброса объект перечитывается, старая ссылка
+        переименованного объекта больше не находит его'''
+        self.groups.get(slug='test-slug')
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed')
+        self.groups.invalidate(self.group)
+
+        self.assertEqual(self.groups.get(pk=self.group.pk).slug, 'renamed')
+        with self.assertRaises(Group.DoesNotExist):
+            self.groups.get(slug='test-slug')
+
+    def test_missing_object(self):
+        with self.assertRaises(Group.DoesNotExist):
+            self.groups.get(slug='missing')
+        with self.assertRaises(ValueError):
+            self.groups.get(title='Тестовая группа')
+
+    def test_invalidated_again_after_commit(self):
+        '''Копия, прочитанная другим процессом до коммита, сбрасывается
+        после него'''
+        with mock.patch('core.objectcache.transaction.on_commit') as commit:
+            self.groups.invalidate_on_commit(self.group)
+        self.groups.get(pk=self.group.pk)
+
+        commit.call_args[0][0]()
+
+        with self.assertNumQueries(1):
+            self.groups.get(pk=self.group.pk)
+
+    def test_only_listed_fields_are_cached(self):
+        '''В общий кэш не попадают поля вне fields, например пароль'''
+        users = ObjectCache(User, aliases=('username',), fields=('username',))
+        user = User.objects.create_user(username='reader', password='secret')
+
+        cached = users.get(username='reader')
+
+        self.assertIn('password', cached.get_deferred_fields())
+        data = cache.get(OBJECT_KEY.format('auth.user', user.pk))
+        self.assertNotIn(user.password.encode(), data)
@@ -0,0 +1,72 @@
+from django.contrib.sessions.models import Session
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..constants import PRIMARY_PIN_COOKIE
+from ..cache import get_or_compute
+from ..routers import PrimaryReplicaRouter, primary_reads, routing
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(TestCase):
+    '''Класс для тестирования маршрутизации на реплики'''
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_feed_reads_go_to_replica_in_request(self):
+        with routing():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica2'])
+    def test_one_replica_per_request(self):
+        '''Все выборки запроса идут на одну и ту же реплику'''
+        with routing():
+            chosen = {self.router.db_for_read(Post) for _ in range(20)}
+        self.assertEqual(len(chosen), 1)
+
+    def test_cache_fills_read_from_primary(self):
+        '''Значение для общего кэша считается с основной базы,
+        после блока запрос снова читает с реплики'''
+        with routing():
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+            database = get_or_compute(
+                'router-test', lambda: self.router.db_for_read(Post), 1
+            )
+            self.assertEqual(database, 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_reads_outside_request_use_primary(self):
+        '''Фоновые задачи и команды читают с основной базы'''
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_write_pins_request_to_primary(self):
+        with routing() as state:
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(state.wrote)
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class PrimaryPinningMiddlewareTest(TestCase):
+    '''Класс для тестирования закрепления клиента за основной базой'''
+
+    def test_write_sets_pin_cookie(self):
+        '''После записи клиент ещё несколько секунд читает с основной'''
+        client = Client()
+        response = client.get(reverse('posts:index'))
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+        response = client.post(reverse('users:signup'), {
+            'username': 'writer',
+            'password1': 'Ochen-Slozhny-Parol-1',
+            'password2': 'Ochen-Slozhny-Parol-1',
+        })
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
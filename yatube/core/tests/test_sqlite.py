@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+
+class SqliteTuningTest(SimpleTestCase):
+    '''Класс для тестирования настроек соединений SQLite'''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tuning.sqlite3')
+
+    def pragma(self, name):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path}, alias='tuning'
+        )
+        wrapper.ensure_connection()
+        try:
+            return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+        finally:
+            wrapper.close()
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_tuning_can_be_disabled(self):
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Job
+from ..tasks import claim_job, prune_jobs, run_pending, task
+
+CALLS = []
+
+
+@task
+def remember(value):
+    CALLS.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError('Задача упала')
+
+
+class TaskQueueTest(TestCase):
+    '''Класс для тестирования очереди фоновых задач'''
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delayed_task_runs_in_worker(self):
+        '''Отложенная задача выполняется воркером, а не при вызове'''
+        job = remember.delay('значение')
+
+        self.assertEqual(CALLS, [])
+        call_command('runworker', burst=True, stdout=StringIO())
+
+        self.assertEqual(CALLS, ['значение'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_failed_task_is_retried_then_failed(self):
+        '''Упавшая задача откладывается для повтора,
+        после последней попытки помечается ошибкой'''
+        job = explode.delay()
+
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('Задача упала', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_old_done_jobs_are_pruned(self):
+        '''Старые выполненные задачи удаляются, остальные остаются'''
+        old = remember.delay('старая')
+        fresh = remember.delay('свежая')
+        queued = remember.delay('в очереди')
+        run_pending()
+        Job.objects.filter(pk__in=(old.pk, queued.pk)).update(
+            run_after=timezone.now() - timedelta(days=2)
+        )
+        Job.objects.filter(pk=queued.pk).update(status=Job.QUEUED)
+
+        self.assertEqual(prune_jobs(), 1)
+        self.assertEqual(
+            set(Job.objects.values_list('pk', flat=True)),
+            {fresh.pk, queued.pk},
+        )
+
+    def test_expired_lock_is_reclaimed(self):
+        '''Задачу упавшего воркера захватывает другой после таймаута'''
+        job = remember.delay('снова')
+        self.assertEqual(claim_job().pk, job.pk)
+        self.assertIsNone(claim_job())
+
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(claim_job().pk, job.pk)
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_queued_email_backend(self):
+        '''Письмо уходит из очереди, а не в момент отправки'''
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+
+        self.assertEqual(len(mail.outbox), 0)
+        run_pending()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_queued_email_keeps_attachments(self):
+        '''Вложения письма переживают очередь'''
+        message = mail.EmailMessage(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru']
+        )
+        message.attach('report.bin', b'\x00\xff', 'application/octet-stream')
+        message.attach('notes.txt', 'Заметки', 'text/plain')
+        message.send()
+
+        run_pending()
+
+        self.assertEqual(
+            mail.outbox[0].attachments,
+            [
+                ('report.bin', b'\x00\xff', 'application/octet-stream'),
+                ('notes.txt', 'Заметки', 'text/plain'),
+            ],
+        )
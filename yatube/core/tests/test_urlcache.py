@@ -0,0 +1,61 @@
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+from django.urls import NoReverseMatch, path, reverse
+
+from ..urlcache import fast_reverse
+
+
+def dummy(request, **kwargs):
+    pass
+
+
+urlpatterns = [
+    path('people/<str:username>/', dummy, name='profile'),
+]
+
+
+class FastReverseTest(SimpleTestCase):
+    '''Класс для тестирования кэша обращения URL'''
+
+    def test_matches_reverse(self):
+        '''Адреса совпадают с reverse(), включая экранирование'''
+        cases = (
+            ('posts:index', (), {}),
+            ('posts:post_detail', (42,), {}),
+            ('posts:group_list', (), {'slug': 'test-slug'}),
+            ('posts:profile', ('user.name+1@mail',), {}),
+            ('posts:profile', ('пользователь',), {}),
+            ('api:v1:profile', ('a{0}b',), {}),
+        )
+        for viewname, args, kwargs in cases:
+            with self.subTest(viewname=viewname, args=args):
+                self.assertEqual(
+                    fast_reverse(viewname, args, kwargs),
+                    reverse(viewname, args=args, kwargs=kwargs),
+                )
+
+    def test_empty_argument_raises(self):
+        '''Пустой аргумент приводит к обычной ошибке reverse()'''
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('posts:profile', ('',))
+
+    def test_urlconf_change_resets_patterns(self):
+        '''Смена ROOT_URLCONF сбрасывает заготовки адресов'''
+        fast_reverse('posts:profile', ('user',))
+
+        with override_settings(ROOT_URLCONF=__name__):
+            self.assertEqual(
+                fast_reverse('profile', ('user',)), '/people/user/'
+            )
+            with self.assertRaises(NoReverseMatch):
+                fast_reverse('posts:profile', ('user',))
+
+    def test_template_tag(self):
+        '''Тег fasturl рисует тот же адрес, что и url'''
+        rendered = Template(
+            "{% load fast_url %}{% fasturl 'posts:profile' name %}"
+            "|{% url 'posts:profile' name %}"
+        ).render(Context({'name': 'a&b'}))
+
+        fast, slow = rendered.split('|')
+        self.assertEqual(fast, slow)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('stats/', views.stats, name='stats'),
+    path('stats/reset/', views.stats_reset, name='stats_reset'),
+]
@@ -1,4 +1,9 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
+
+from .instrumentation import stats as request_stats
 
 
 def page_not_found(request, exception):
@@ -20,3 +25,19 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def stats(request):
+    '''Агрегированные замеры запросов текущего процесса'''
+    rows = request_stats.snapshot()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'views': rows})
+    return render(request, 'core/stats.html', {'rows': rows})
+
+
+@staff_member_required
+@require_POST
+def stats_reset(request):
+    request_stats.reset()
+    return redirect('core:stats')
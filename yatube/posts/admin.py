@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import matching_comments, ranked_hits, terms
 
 
 @admin.register(Post)
@@ -19,6 +20,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        '''Поиск по тексту через инвертированный индекс вместо LIKE'''
+        if not terms(search_term):
+            return queryset, False
+        hits = ranked_hits(search_term).values('post')
+        return queryset.filter(pk__in=hits), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -38,6 +46,12 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('text', 'created')
     search_fields = ('post', 'author', 'text')
 
+    def get_search_results(self, request, queryset, search_term):
+        '''Поиск по тексту через инвертированный индекс вместо LIKE'''
+        if not terms(search_term):
+            return queryset, False
+        return queryset.filter(pk__in=matching_comments(search_term)), False
+
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
@@ -5,3 +5,6 @@ class PostsConfig(AppConfig):
     '''Класс, конфигурирующий приложение'''
 
     name = 'posts'
+
+    def ready(self):
+        import posts.signals  # noqa: F401
@@ -0,0 +1,39 @@
+'''Архив сообщества и автора: все посты одной страницей.
+
+Страница не собирается в памяти целиком: оболочка шаблона
+разрезается по метке ARCHIVE_MARKER, а посты между её частями
+читаются курсором (на PostgreSQL - серверным) и отрисовываются
+пачками по мере отправки ответа.'''
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+
+from .constants import ARCHIVE_CHUNK_SIZE
+
+ARCHIVE_MARKER = '<!-- archive -->'
+
+
+def _chunks(posts, size):
+    batch = []
+    for post in posts.iterator(chunk_size=size):
+        batch.append(post)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def archive_response(request, posts, context, size=ARCHIVE_CHUNK_SIZE):
+    '''Потоковый ответ со всеми постами выборки, от новых к старым'''
+    page = render_to_string('posts/archive.html', context, request)
+    head, tail = page.split(ARCHIVE_MARKER)
+    chunk = get_template('posts/includes/archive_chunk.html')
+    posts = posts.order_by('-pub_date', '-pk')
+
+    def content():
+        yield head
+        for batch in _chunks(posts, size):
+            yield chunk.render({**context, 'posts': batch}, request)
+        yield tail
+
+    return StreamingHttpResponse(content())
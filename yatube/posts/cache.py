@@ -0,0 +1,89 @@
+'''Поколения кэша лент.
+
+Страницы лент кэшируются с номером поколения в ключе: запись поста
+увеличивает номер, и все старые фрагменты перестают находиться сразу,
+без ожидания истечения TTL. Карточки постов кэшируются по
+(post.id, post.updated, поколение подписей) и переживают смену
+поколения лент.
+
+Названия сообществ и имена авторов выводятся на всех страницах, но
+не входят в данные постов, поэтому их изменение увеличивает отдельное
+поколение подписей (labels) вместе с поколением лент.
+
+Здесь же объявлены кэши объектов (core.objectcache) для точечных
+выборок сообществ, пользователей и постов.'''
+from django.core.cache import cache
+
+from core.objectcache import ObjectCache
+
+from .constants import CACHE_UPDATE, POST_CARD_CACHE_TTL, USER_LABEL_FIELDS
+from .models import Group, Post, User
+
+FEED_GENERATION_KEY = 'feed_generation'
+FOLLOW_GENERATION_KEY = 'follow_generation:{}'
+SUGGESTIONS_GENERATION_KEY = 'suggestions_generation'
+LABELS_GENERATION_KEY = 'labels_generation'
+
+group_cache = ObjectCache(Group, aliases=('slug',))
+user_cache = ObjectCache(
+    User, aliases=('username',), fields=USER_LABEL_FIELDS
+)
+post_cache = ObjectCache(Post)
+
+
+def _generation(key):
+    return cache.get_or_set(key, 1, None)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def bump_feed_generation():
+    '''Сбрасывает закэшированные страницы всех лент'''
+    _bump(FEED_GENERATION_KEY)
+
+
+def bump_follow_generation(user_id):
+    '''Сбрасывает закэшированную ленту подписок пользователя'''
+    _bump(FOLLOW_GENERATION_KEY.format(user_id))
+
+
+def bump_labels_generation():
+    '''Сбрасывает страницы после изменения сообщества или имени автора'''
+    _bump(LABELS_GENERATION_KEY)
+    bump_feed_generation()
+
+
+def labels_version():
+    return _generation(LABELS_GENERATION_KEY)
+
+
+def bump_suggestions_generation():
+    '''Отмечает пересчёт предложений авторов'''
+    _bump(SUGGESTIONS_GENERATION_KEY)
+
+
+def suggestions_version():
+    return _generation(SUGGESTIONS_GENERATION_KEY)
+
+
+def feed_version(user=None):
+    '''Версия ленты для ключа фрагмента кэша'''
+    version = str(_generation(FEED_GENERATION_KEY))
+    if user is not None:
+        follow = _generation(FOLLOW_GENERATION_KEY.format(user.pk))
+        version = f'{version}.{user.pk}.{follow}'
+    return version
+
+
+def feed_cache_context(user=None):
+    '''Переменные шаблона для кэширования ленты и карточек'''
+    return {
+        'cache_updates': CACHE_UPDATE,
+        'post_card_ttl': POST_CARD_CACHE_TTL,
+        'feed_version': feed_version(user),
+    }
@@ -7,4 +7,43 @@ COUNT_POSTS_LIMIT_1 = 10
 COUNT_POSTS_LIMIT_2 = 3
 
 '''Константы параметров кэширования'''
-CACHE_UPDATE = 20
+CACHE_UPDATE = 60 * 15
+POST_CARD_CACHE_TTL = 60 * 60 * 24
+POST_CARD_TEMPLATE = 'posts/includes/detailed_information.html'
+
+'''Поля пользователя, которые выводятся на страницах постов'''
+USER_LABEL_FIELDS = frozenset(('username', 'first_name', 'last_name'))
+
+'''Параметр запроса с курсором пагинации'''
+CURSOR_PARAM = 'cursor'
+
+'''Константы материализованной ленты подписок'''
+FANOUT_SYNC_LIMIT = 100
+FANOUT_FOLLOWERS_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 200
+
+'''Производные изображения поста: ширина, высота, формат'''
+POST_IMAGE_RENDITIONS = {
+    'feed': (960, 576, 'JPEG'),
+    'detail': (1772, 1063, 'JPEG'),
+    'retina': (3543, 2126, 'JPEG'),
+    'webp': (960, 576, 'WEBP'),
+}
+RENDITIONS_UPLOAD_TO = 'posts/renditions/'
+RENDITIONS_QUALITY = 85
+
+'''Константы полнотекстового поиска'''
+SEARCH_TERM_LENGTH = 64
+SEARCH_POST_WEIGHT = 2
+SEARCH_COMMENT_WEIGHT = 1
+SEARCH_MAX_TERMS = 10
+SEARCH_IDF_SCALE = 1000
+
+'''Архив ленты: постов в одном отрисованном куске ответа'''
+ARCHIVE_CHUNK_SIZE = 100
+
+'''Время жизни закэшированного списка подписок пользователя'''
+FOLLOWING_CACHE_TTL = 60 * 60 * 24
+
+'''Предложения авторов: сколько хранить и показывать на пользователя'''
+SUGGESTIONS_LIMIT = 5
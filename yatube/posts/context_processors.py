@@ -0,0 +1,8 @@
+from .follow_graph import follow_graph as viewer_follow_graph
+
+
+def follow_graph(request):
+    '''Подписки зрителя в шаблонах: {% if author in follow_graph %}.
+
+    Список подписок читается, только если шаблон к нему обратился.'''
+    return {'follow_graph': viewer_follow_graph(request)}
@@ -0,0 +1,177 @@
+'''Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается в ленты подписчиков автора: сразу, если
+подписчиков немного, или воркером очереди задач. Посты авторов
+с огромным числом подписчиков не раскладываются, а подмешиваются
+в ленту при чтении (fan-out on read). Популярность автора берётся
+из денормализованного счётчика UserStats.followers_count; когда автор
+опускается ниже порога, его свежие посты раскладываются по лентам
+подписчиков задачей backfill_followers.
+
+Автор и дата публикации хранятся в FeedEntry, поэтому страница ленты
+читается по индексу (user, -pub_date, -post). Посты популярных
+авторов читаются отдельным запросом на каждого автора, тоже не больше
+страницы, и сливаются с записями ленты в FollowFeedPaginator.'''
+from django.db.models import Q
+
+from core.tasks import task
+
+from .constants import (
+    FANOUT_FOLLOWERS_LIMIT,
+    FANOUT_SYNC_LIMIT,
+    FEED_BACKFILL_LIMIT,
+)
+from .cache import bump_feed_generation
+from .models import FeedEntry, Follow, Post, UserStats
+from .stats import get_user_stats
+from .utils import CursorPaginator, keyset
+
+POST_FIELDS = ('pk', 'author_id', 'pub_date')
+
+
+def followers_count(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+
+
+def is_celebrity(author):
+    '''Посты автора читаются напрямую, а не из материализованных лент'''
+    followers = followers_count(author.pk)
+    if followers is None:
+        followers = get_user_stats(author).followers_count
+    return followers > FANOUT_FOLLOWERS_LIMIT
+
+
+def feed_entries(user_ids, posts):
+    '''Записи лент читателей user_ids для строк постов POST_FIELDS'''
+    return [
+        FeedEntry(
+            user_id=user_id,
+            post_id=pk,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for pk, author_id, pub_date in posts
+    ]
+
+
+def fan_out_post(post):
+    '''Добавляет пост в ленты подписчиков автора'''
+    if is_celebrity(post.author):
+        return
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    if len(followers) > FANOUT_SYNC_LIMIT:
+        write_feed_entries.delay(post.pk, followers)
+    else:
+        rows = [(post.pk, post.author_id, post.pub_date)]
+        FeedEntry.objects.bulk_create(
+            feed_entries(followers, rows), ignore_conflicts=True
+        )
+
+
+@task
+def write_feed_entries(post_id, user_ids):
+    '''Записывает пост в ленты перечисленных читателей'''
+    posts = Post.objects.filter(pk=post_id).values_list(*POST_FIELDS)
+    FeedEntry.objects.bulk_create(
+        feed_entries(user_ids, posts), ignore_conflicts=True
+    )
+
+
+def backfill_feed(user_id, author_id):
+    '''Заполняет ленту свежими постами автора после подписки'''
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        *POST_FIELDS
+    )[:FEED_BACKFILL_LIMIT]
+    FeedEntry.objects.bulk_create(
+        feed_entries([user_id], posts), ignore_conflicts=True
+    )
+
+
+@task
+def backfill_followers(author_id):
+    '''Раскладывает свежие посты автора по лентам всех подписчиков.
+
+    Вызывается, когда автор перестаёт считаться популярным: посты,
+    опубликованные выше порога, не попали в FeedEntry и иначе
+    пропали бы из лент.'''
+    posts = list(Post.objects.filter(author_id=author_id).values_list(
+        *POST_FIELDS
+    )[:FEED_BACKFILL_LIMIT])
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    entries = []
+    for user_id in followers.iterator(chunk_size=FANOUT_FOLLOWERS_LIMIT):
+        entries.extend(feed_entries([user_id], posts))
+        if len(entries) >= FANOUT_FOLLOWERS_LIMIT:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    bump_feed_generation()
+
+
+def followers_dropped(author_id):
+    '''Отписка, после которой автор опустился до порога популярности'''
+    if followers_count(author_id) == FANOUT_FOLLOWERS_LIMIT:
+        backfill_followers.delay(author_id)
+
+
+def trim_feed(user_id, author_id):
+    '''Убирает из ленты посты автора после отписки'''
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def celebrity_authors(user):
+    '''Авторы из подписок, чьи посты не раскладываются по лентам'''
+    return UserStats.objects.filter(
+        user__in=Follow.objects.filter(user=user).values('author'),
+        followers_count__gt=FANOUT_FOLLOWERS_LIMIT,
+    ).values('user')
+
+
+def follow_feed(user):
+    '''Лента подписок одним запросом: материализованные записи плюс
+    посты популярных авторов. Листается FollowFeedPaginator, запрос
+    нужен для старых ссылок ?page=N'''
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=celebrity_authors(user))
+    )
+
+
+def feed_sources(user):
+    '''Источники ленты подписок: строки с pub_date и поле id поста.
+
+    Записи ленты читаются по индексу (user, -pub_date, -post), посты
+    каждого популярного автора - по индексу (author, -pub_date, -id).'''
+    yield FeedEntry.objects.filter(user=user), 'post_id'
+    for author_id in celebrity_authors(user).values_list('user', flat=True):
+        yield Post.objects.filter(author_id=author_id), 'pk'
+
+
+class FollowFeedPaginator(CursorPaginator):
+    '''Курсорный пагинатор ленты подписок.
+
+    Из каждого источника feed_sources() читается не больше строк, чем
+    нужно на страницу; ключи (pub_date, id поста) сливаются, а посты
+    страницы загружаются одним запросом по id.'''
+
+    def __init__(self, user, per_page, **kwargs):
+        super().__init__(follow_feed(user).for_feed(), per_page, **kwargs)
+        self.user = user
+
+    def window(self, position, limit):
+        keys = set()
+        for rows, key in feed_sources(self.user):
+            rows = keyset(rows, position, key).values_list('pub_date', key)
+            keys.update(rows[:limit])
+        reverse = position is not None and position[0]
+        keys = sorted(keys, reverse=not reverse)[:limit]
+        posts = Post.objects.for_feed().in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
@@ -0,0 +1,66 @@
+'''Подписки зрителя для любого числа авторов на странице.
+
+Список авторов, на которых подписан пользователь, читается одним
+запросом и хранится в кэше компактным массивом id. На время запроса
+он превращается в frozenset, так что проверка подписки на каждого
+автора карточки, комментария или подсказки не обращается к базе.
+Подписка и отписка сбрасывают кэш через сигналы Follow.'''
+from array import array
+
+from django.core.cache import cache
+
+from core.routers import primary_reads
+
+from .constants import FOLLOWING_CACHE_TTL
+from .models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+
+
+def load_following(user_id):
+    '''id авторов, на которых подписан пользователь'''
+    key = FOLLOWING_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        with primary_reads():
+            ids = array('L', sorted(
+                Follow.objects.filter(user_id=user_id)
+                .values_list('author_id', flat=True)
+            ))
+        cache.set(key, ids, FOLLOWING_CACHE_TTL)
+    return frozenset(ids)
+
+
+def invalidate_following(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id))
+
+
+class FollowGraph:
+    '''Подписки одного зрителя, загружаются при первом обращении'''
+
+    def __init__(self, user):
+        self.user = user
+        self._following = None
+
+    @property
+    def following(self):
+        if self._following is None:
+            self._following = (
+                load_following(self.user.pk)
+                if self.user.is_authenticated else frozenset()
+            )
+        return self._following
+
+    def is_following(self, author):
+        '''Подписан ли зритель на автора (объект или id)'''
+        return getattr(author, 'pk', author) in self.following
+
+    def __contains__(self, author):
+        return self.is_following(author)
+
+
+def follow_graph(request):
+    '''Граф подписок зрителя, один на запрос'''
+    if not hasattr(request, '_follow_graph'):
+        request._follow_graph = FollowGraph(request.user)
+    return request._follow_graph
@@ -0,0 +1,225 @@
+'''Свежесть страниц для условных GET-запросов.
+
+ETag ленты строится из поколения лент (posts.cache), которое меняет
+любая запись поста, и даты последней публикации. Дата берётся по
+индексу ленты и кэшируется в ключе с поколением. Пока в лентах ничего
+не менялось, ответ 304 отдаётся без запроса к таблице постов и без
+отрисовки шаблона.
+В ETag входит и поколение подписей: переименование сообщества или
+автора меняет страницу, не трогая посты.'''
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core.cache import get_or_compute
+from core.objectcache import get_cached_or_404
+
+from .cache import (
+    feed_version,
+    group_cache,
+    labels_version,
+    post_cache,
+    suggestions_version,
+    user_cache,
+)
+from .constants import CACHE_UPDATE
+from .feed import feed_sources
+from .follow_graph import follow_graph
+from .models import Post
+from .stats import get_user_stats
+
+FRESHNESS_KEY = 'feed_freshness:{}:{}'
+
+
+def latest_pub_date(sources):
+    '''Последняя публикация среди запросов ленты, каждый по индексу'''
+    dates = [
+        rows.order_by().aggregate(pub_date=Max('pub_date'))['pub_date']
+        for rows in sources
+    ]
+    return max((date for date in dates if date is not None), default=None)
+
+
+def feed_freshness(sources, scope, user=None):
+    '''Поколение ленты и дата её последней публикации'''
+    version = feed_version(user)
+    key = FRESHNESS_KEY.format(version, scope)
+    return {
+        'version': version,
+        'pub_date': get_or_compute(
+            key, lambda: latest_pub_date(sources), CACHE_UPDATE
+        ),
+    }
+
+
+def conditional(freshness, viewer=None):
+    '''condition() по словарю из freshness(request, *args, **kwargs).
+
+    ETag строится из всех значений словаря и строки состояния зрителя
+    viewer(request, *args, **kwargs), Last-Modified - самая поздняя
+    дата среди значений. Словарь считается один раз на запрос.'''
+    def values(request, *args, **kwargs):
+        if not hasattr(request, '_freshness'):
+            request._freshness = freshness(request, *args, **kwargs)
+        return request._freshness
+
+    def etag(request, *args, **kwargs):
+        current = values(request, *args, **kwargs)
+        parts = [f'{key}={current[key]}' for key in sorted(current)]
+        if viewer is not None:
+            parts.append(viewer(request, *args, **kwargs))
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        dates = [
+            value for value in values(request, *args, **kwargs).values()
+            if isinstance(value, datetime)
+        ]
+        return max(dates) if dates else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def feed_condition(source, viewer=None):
+    '''conditional() для ленты, описанной функцией source.
+
+    source принимает аргументы представления и возвращает (запросы
+    постов ленты, ключ ленты, пользователь для версии кэша). Запросы
+    выполняются только при промахе кэша. Ключ должен включать всё,
+    кроме постов, от чего зависит ответ.'''
+    def freshness(request, *args, **kwargs):
+        sources, scope, user = source(request, *args, **kwargs)
+        return {
+            'scope': scope,
+            'labels': labels_version(),
+            **feed_freshness(sources, scope, user),
+        }
+
+    return conditional(freshness, viewer)
+
+
+def request_cached(func):
+    '''Запоминает результат func(request, *args) на время запроса,
+    чтобы представление не повторяло запросы источника свежести'''
+    @wraps(func)
+    def wrapper(request, *args):
+        memo = request.__dict__.setdefault('_request_cache', {})
+        key = (func.__name__, *args)
+        if key not in memo:
+            memo[key] = func(request, *args)
+        return memo[key]
+    return wrapper
+
+
+@request_cached
+def load_group(request, slug):
+    return get_cached_or_404(group_cache, slug=slug)
+
+
+@request_cached
+def load_author(request, username):
+    return get_cached_or_404(user_cache, username=username)
+
+
+@request_cached
+def load_post(request, post_id):
+    '''Пост, его автор и группа из кэша объектов'''
+    post = get_cached_or_404(post_cache, pk=post_id)
+    post.author = user_cache.get(pk=post.author_id)
+    if post.group_id is not None:
+        post.group = group_cache.get(pk=post.group_id)
+    return post
+
+
+@request_cached
+def is_following(request, username):
+    return (
+        request.user.is_authenticated
+        and follow_graph(request).is_following(
+            load_author(request, username)
+        )
+    )
+
+
+def all_posts(request):
+    return (Post.objects.all(),), 'all', None
+
+
+def group_posts(request, slug):
+    group = load_group(request, slug)
+    return (group.posts.all(),), f'group:{group.pk}', None
+
+
+def author_posts(request, username):
+    author = load_author(request, username)
+    stats = get_user_stats(author)
+    scope = 'author:{}:{}:{}:{}'.format(
+        author.pk,
+        stats.posts_count,
+        stats.followers_count,
+        stats.following_count,
+    )
+    return (author.posts.all(),), scope, None
+
+
+def followed_posts(request):
+    return (
+        (rows for rows, _ in feed_sources(request.user)),
+        f'follow:{request.user.pk}',
+        request.user,
+    )
+
+
+def post_with_comments(request, post_id):
+    '''Изменение поста, его комментариев и счётчика автора'''
+    freshness = Post.objects.filter(pk=post_id).order_by().values(
+        'updated', 'author__stats__posts_count',
+    ).annotate(
+        last_comment=Max('comments__created'),
+        comments=Count('comments'),
+    ).first()
+    if freshness is None:
+        return {'missing': post_id}
+    return {'labels': labels_version(), **freshness}
+
+
+def viewer_state(request, *args, **kwargs):
+    '''Зритель: от него зависят шапка, форма комментария и кнопки.
+
+    Вход в систему меняет CSRF-токен формы, поэтому он тоже входит
+    в состояние, иначе браузер покажет форму со старым токеном.'''
+    if request.user.is_authenticated:
+        return 'user:{}:{}'.format(
+            request.user.pk, request.META.get('CSRF_COOKIE')
+        )
+    return 'anonymous'
+
+
+def profile_viewer_state(request, username):
+    '''Зритель профиля: ещё кнопка подписки и колонка предложений'''
+    state = viewer_state(request)
+    if request.user.is_authenticated:
+        following = is_following(request, username)
+        state = f'{state}:following={following}:{suggestions_version()}'
+    return state
+
+
+def viewer_cache_control(view):
+    '''Страницы анонимов может хранить обратный прокси,
+    страницы пользователей - только его браузер'''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=0, must_revalidate=True
+            )
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.cache import bump_suggestions_generation
+from posts.constants import SUGGESTIONS_LIMIT
+from posts.models import Follow, FollowSuggestion
+from posts.suggestions import FollowMatrix, build_suggestions
+from posts.utils import batches
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает предложения авторов по графу подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=SUGGESTIONS_LIMIT,
+            help='Сколько предложений хранить на пользователя',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при чтении и записи',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        matrix = FollowMatrix(batch_size)
+        total = 0
+        for users in batches(matrix.users, batch_size):
+            # Расчёт идёт вне транзакции: на SQLite она держит блокировку
+            # записи, и пока она открыта, посты и подписки не сохраняются.
+            suggestions = list(
+                build_suggestions(matrix, users, options['limit'])
+            )
+            with transaction.atomic():
+                FollowSuggestion.objects.filter(user_id__in=users).delete()
+                FollowSuggestion.objects.bulk_create(suggestions)
+            total += len(suggestions)
+        FollowSuggestion.objects.exclude(
+            user__in=Follow.objects.values('user')
+        ).delete()
+        bump_suggestions_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписок: {len(matrix.indices)}, предложений: {total}'
+        ))
@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Comment, Follow, Post
+from posts.transfer import (
+    COMMENT_FIELDS,
+    FIELDS,
+    FOLLOW_FIELDS,
+    FORMATS,
+    copy_images,
+    export_comments,
+    export_follows,
+    export_image,
+    export_rows,
+    file_format,
+    write_records,
+)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии и подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для постов')
+        parser.add_argument(
+            '--comments',
+            help='Файл для комментариев',
+        )
+        parser.add_argument(
+            '--follows',
+            help='Файл для подписок',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файлов, по умолчанию по расширению',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при чтении постов',
+        )
+        parser.add_argument(
+            '--media-dir',
+            help='Каталог, куда скопировать картинки постов',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Количество потоков для копирования картинок',
+        )
+
+    def handle(self, *args, **options):
+        self.format = options['format']
+        chunk_size = options['chunk_size']
+        exports = [
+            ('постов', options['path'], FIELDS,
+             export_rows(Post.objects.all(), chunk_size)),
+            ('комментариев', options['comments'], COMMENT_FIELDS,
+             export_comments(Comment.objects.all(), chunk_size)),
+            ('подписок', options['follows'], FOLLOW_FIELDS,
+             export_follows(Follow.objects.all(), chunk_size)),
+        ]
+        totals = [
+            f'{label} {self.write(path, records, fields)}'
+            for label, path, fields, records in exports
+            if path
+        ]
+        if options['media_dir']:
+            self.export_images(options, chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            'Выгружено: ' + ', '.join(totals)
+        ))
+
+    def write(self, path, records, fields):
+        fmt = file_format(path, self.format)
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                return write_records(stream, records, fmt, fields)
+        except OSError as error:
+            raise CommandError(f'Не удалось выгрузить {path}: {error}')
+
+    def export_images(self, options, chunk_size):
+        '''Картинки копируются пачками, чтобы не держать все имена'''
+        copy = export_image(options['media_dir'])
+        names = Post.objects.exclude(image='').order_by('pk').values_list(
+            'image', flat=True
+        )
+        batch = []
+        for name in names.iterator(chunk_size=chunk_size):
+            batch.append(name)
+            if len(batch) >= chunk_size:
+                copy_images(batch, copy, options['workers'])
+                batch = []
+        copy_images(batch, copy, options['workers'])
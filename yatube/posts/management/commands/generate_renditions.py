@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import is_stale, render_post_images
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие копии картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Размер пачки при чтении постов',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only(
+            'id', 'image', 'renditions'
+        )
+        total = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            if is_stale(post):
+                render_post_images(post.pk)
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {total}'))
@@ -0,0 +1,190 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import (
+    FORMATS,
+    PostSources,
+    copy_images,
+    file_format,
+    follows_imported,
+    import_image,
+    index_comments,
+    index_posts,
+    manual_dates,
+    parse_date,
+    read_records,
+    rebuild_imported,
+    save_batch,
+)
+from posts.utils import batches
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты, комментарии и подписки из NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами')
+        parser.add_argument(
+            '--comments',
+            help='Файл с комментариями к постам из path',
+        )
+        parser.add_argument(
+            '--follows',
+            help='Файл с подписками',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файлов, по умолчанию по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create',
+        )
+        parser.add_argument(
+            '--media-dir',
+            help='Каталог с картинками постов',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Количество потоков для копирования картинок',
+        )
+
+    def handle(self, *args, **options):
+        self.format = options['format']
+        self.batch_size = options['batch_size']
+        self.workers = options['workers']
+        self.copy = options['media_dir'] and import_image(
+            options['media_dir']
+        )
+        self.sources = None
+        self.authors = Counter()
+        self.commenters = Counter()
+        self.imported = Counter()
+        self.skipped = 0
+        try:
+            with manual_dates():
+                if options['comments']:
+                    with PostSources() as self.sources:
+                        self.load(options['path'], self.save_posts)
+                        self.load(options['comments'], self.save_comments)
+                else:
+                    self.load(options['path'], self.save_posts)
+                if options['follows']:
+                    self.load(options['follows'], self.save_follows)
+        finally:
+            rebuild_imported(self.authors, self.commenters, self.batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: постов {}, комментариев {}, подписок {}; '
+            'пропущено: {}'.format(
+                self.imported['posts'],
+                self.imported['comments'],
+                self.imported['follows'],
+                self.skipped,
+            )
+        ))
+
+    def load(self, path, save):
+        try:
+            with open(path, encoding='utf-8', newline='') as stream:
+                records = read_records(stream, file_format(path, self.format))
+                for batch in batches(records, self.batch_size):
+                    save(batch)
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось загрузить {path}: {error}')
+
+    def users(self, usernames):
+        return dict(User.objects.filter(
+            username__in=set(usernames)
+        ).values_list('username', 'pk'))
+
+    def save_posts(self, batch):
+        '''Пачка постов: авторы и группы двумя запросами, одна транзакция'''
+        authors = self.users(record['author'] for record in batch)
+        groups = dict(Group.objects.filter(
+            slug__in={record['group'] for record in batch if record['group']}
+        ).values_list('slug', 'pk'))
+        groups[None] = None
+        images = {}
+        if self.copy:
+            images = copy_images(
+                [record['image'] for record in batch], self.copy, self.workers
+            )
+        posts, sources = [], []
+        for record in batch:
+            group = record['group'] or None
+            if record['author'] not in authors or group not in groups:
+                self.skipped += 1
+                continue
+            sources.append(str(record.get('id') or ''))
+            posts.append(Post(
+                author_id=authors[record['author']],
+                group_id=groups[group],
+                text=record['text'],
+                pub_date=parse_date(record['pub_date']),
+                image=images.get(record['image'], record['image']),
+            ))
+        save_batch(Post, posts, self.batch_size)
+        if self.sources is not None:
+            self.sources.add([
+                (source, post.pk)
+                for source, post in zip(sources, posts) if source
+            ])
+        index_posts(posts)
+        self.authors.update(post.author_id for post in posts)
+        self.imported['posts'] += len(posts)
+
+    def save_comments(self, batch):
+        '''Пачка комментариев к постам, загруженным этой же командой'''
+        authors = self.users(record['author'] for record in batch)
+        posts = self.sources.get(str(record['post']) for record in batch)
+        comments = []
+        for record in batch:
+            post_id = posts.get(str(record['post']))
+            if post_id is None or record['author'] not in authors:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=authors[record['author']],
+                text=record['text'],
+                created=parse_date(record['created']),
+            ))
+        save_batch(Comment, comments, self.batch_size)
+        index_comments(comments)
+        self.commenters.update(comment.author_id for comment in comments)
+        self.imported['comments'] += len(comments)
+
+    def save_follows(self, batch):
+        '''Пачка подписок, уже существующие пропускаются'''
+        users = self.users(
+            name for record in batch for name in record.values()
+        )
+        pairs = {
+            (users[record['user']], users[record['author']])
+            for record in batch
+            if record['user'] in users and record['author'] in users
+            and record['user'] != record['author']
+        }
+        pairs -= set(Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs},
+        ).values_list('user_id', 'author_id'))
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                [
+                    Follow(user_id=user_id, author_id=author_id)
+                    for user_id, author_id in pairs
+                ],
+                ignore_conflicts=True,
+            )
+        follows_imported(pairs)
+        self.skipped += len(batch) - len(pairs)
+        self.imported['follows'] += len(pairs)
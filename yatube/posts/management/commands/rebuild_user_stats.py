@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts.models import User, UserStats
+from posts.stats import stats_annotations
+from posts.utils import batches
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = list(stats_annotations())
+        users = User.objects.order_by('pk').values_list('pk', flat=True)
+        total = 0
+        for batch in batches(
+            users.iterator(chunk_size=batch_size), batch_size
+        ):
+            with transaction.atomic():
+                total += self.rebuild(batch, fields)
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано: {total}'))
+
+    def rebuild(self, user_ids, fields):
+        '''Пересчитывает пачку пользователей на месте'''
+        # Пустой UPDATE берёт блокировку записи на SQLite и блокировки
+        # строк на PostgreSQL до подсчёта: конкурентный bump() ждёт
+        # конца транзакции и прибавляется к пересчитанному значению.
+        stats = UserStats.objects.filter(user_id__in=user_ids)
+        stats.update(posts_count=F('posts_count'))
+        existing = dict(stats.values_list('user_id', 'pk'))
+        rows = [
+            UserStats(
+                pk=existing.get(row['pk']),
+                user_id=row['pk'],
+                **{field: row[field] for field in fields},
+            )
+            for row in User.objects.filter(pk__in=user_ids).annotate(
+                **stats_annotations()
+            ).values('pk', *fields)
+        ]
+        UserStats.objects.bulk_update(
+            [row for row in rows if row.pk is not None], fields
+        )
+        UserStats.objects.bulk_create(
+            [row for row in rows if row.pk is None], ignore_conflicts=True
+        )
+        return len(rows)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Comment, Post, SearchEntry
+from posts.search import comment_entries, post_entries
+from posts.utils import batches
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при чтении и записи',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        total = self.reindex(
+            Post.objects.only('id', 'text'),
+            post_entries,
+            SearchEntry.objects.filter(comment__isnull=True),
+            'post_id__in',
+        ) + self.reindex(
+            Comment.objects.only('id', 'post', 'text'),
+            comment_entries,
+            SearchEntry.objects.all(),
+            'comment_id__in',
+        )
+        self.stdout.write(self.style.SUCCESS(f'Записей в индексе: {total}'))
+
+    def reindex(self, queryset, build, entries, lookup):
+        '''Записи пачки объектов заменяются в короткой транзакции'''
+        ids = queryset.order_by('pk').values_list('pk', flat=True)
+        total = 0
+        for batch in batches(
+            ids.iterator(chunk_size=self.batch_size), self.batch_size
+        ):
+            with transaction.atomic():
+                entries.filter(**{lookup: batch}).delete()
+                created = SearchEntry.objects.bulk_create([
+                    entry
+                    for obj in queryset.filter(pk__in=batch)
+                    for entry in build(obj)
+                ])
+            total += len(created)
+        return total
@@ -0,0 +1,61 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FEED_BACKFILL_LIMIT = 200
+
+
+def backfill_feeds(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    for follow in Follow.objects.iterator():
+        posts = Post.objects.filter(author_id=follow.author_id).order_by(
+            '-pub_date'
+        ).values_list('pk', flat=True)[:FEED_BACKFILL_LIMIT]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=follow.user_id, post_id=pk) for pk in posts],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_auto_20220822_1947'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ('-created',)},
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Читатель ленты'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='renditions',
+            field=models.TextField(blank=True, editable=False, verbose_name='Копии картинки'),
+        ),
+    ]
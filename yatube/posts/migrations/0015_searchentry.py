@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveIntegerField(verbose_name='Вес')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='posts.Comment', verbose_name='Комментарий')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ),
+    ]
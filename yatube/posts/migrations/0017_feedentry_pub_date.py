@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_post_fields(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    post = Post.objects.filter(pk=OuterRef('post'))
+    FeedEntry.objects.update(
+        author=Subquery(post.values('author')[:1]),
+        pub_date=Subquery(post.values('pub_date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='author',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='authored_feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Автор поста'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='pub_date',
+            field=models.DateTimeField(null=True, verbose_name='Дата публикации поста'),
+        ),
+        migrations.RunPython(copy_post_fields, migrations.RunPython.noop),
+    ]
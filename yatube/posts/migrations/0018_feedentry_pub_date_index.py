@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_feedentry_pub_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='authored_feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Автор поста'),
+        ),
+        migrations.AlterField(
+            model_name='feedentry',
+            name='pub_date',
+            field=models.DateTimeField(verbose_name='Дата публикации поста'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_pub_date_idx'),
+        ),
+    ]
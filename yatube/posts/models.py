@@ -1,11 +1,66 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 
-from .constants import STRING_LENGHT_LIMIT
+from .constants import SEARCH_TERM_LENGTH, STRING_LENGHT_LIMIT
 
 User = get_user_model()
 
 
+def parse_renditions(value):
+    '''Разбирает Post.renditions, испорченное значение считаем пустым'''
+    try:
+        renditions = json.loads(value or '{}')
+    except ValueError:
+        return {}
+    return renditions if isinstance(renditions, dict) else {}
+
+
+class PostQuerySet(models.QuerySet):
+    '''Готовые выборки постов без N+1 запросов'''
+
+    FEED_FIELDS = (
+        'id',
+        'text',
+        'pub_date',
+        'updated',
+        'image',
+        'renditions',
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group',
+        'group__title',
+        'group__slug',
+    )
+
+    def for_feed(self):
+        '''Посты для лент: автор и группа одним запросом'''
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        '''Пост со счётчиками автора и комментариями с их авторами'''
+        return self.select_related('author__stats', 'group').prefetch_related(
+            models.Prefetch(
+                'comments',
+                queryset=Comment.objects.for_detail(),
+            )
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    '''Готовые выборки комментариев без N+1 запросов'''
+
+    def for_detail(self):
+        '''Комментарии вместе с авторами'''
+        return self.select_related('author').only(
+            'id', 'post', 'text', 'created', 'author', 'author__username'
+        )
+
+
 class Post(models.Model):
     '''Объявляем класс Post, наследник класса Model из пакета models
     Описываем поля модели и их типы'''
@@ -17,6 +72,10 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор публикации',
@@ -36,14 +95,49 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    renditions = models.TextField(
+        verbose_name='Копии картинки',
+        blank=True,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
 
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:STRING_LENGHT_LIMIT]
 
+    @property
+    def image_renditions(self):
+        '''Готовые копии текущей картинки: url и размеры по имени'''
+        renditions = parse_renditions(self.renditions)
+        if not self.image or renditions.pop('source', '') != self.image.name:
+            return {}
+        return {
+            name: {
+                'url': default_storage.url(rendition['path']),
+                'width': rendition['width'],
+                'height': rendition['height'],
+            }
+            for name, rendition in renditions.items()
+        }
+
 
 class Group(models.Model):
     '''Объявляем класс Group, наследник класса Model из пакета models
@@ -89,8 +183,15 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -118,6 +219,152 @@ class Follow(models.Model):
                 fields=["user", "author"], name="unique_follow"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'подписчик: {self.user}, автор: {self.author}'
+
+
+class FeedEntry(models.Model):
+    '''Запись материализованной ленты подписок пользователя.
+
+    Автор и дата публикации копируются из поста, чтобы страница ленты
+    читалась по индексу (user, -pub_date, -post) без соединения.'''
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель ленты',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор поста',
+        related_name='authored_feed_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации поста',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'лента: {self.user}, пост: {self.post_id}'
+
+
+class UserStats(models.Model):
+    '''Денормализованные счётчики пользователя'''
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        related_name='stats',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Комментариев',
+        default=0,
+    )
+
+    def __str__(self):
+        return f'счётчики: {self.user}'
+
+
+class SearchEntry(models.Model):
+    '''Запись инвертированного индекса: основа слова и её вес в посте'''
+    term = models.CharField(
+        verbose_name='Основа слова',
+        max_length=SEARCH_TERM_LENGTH,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        related_name='search_entries',
+        on_delete=models.CASCADE,
+    )
+    comment = models.ForeignKey(
+        Comment,
+        verbose_name='Комментарий',
+        related_name='search_entries',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+    )
+    weight = models.PositiveIntegerField(
+        verbose_name='Вес',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
+
+
+class FollowSuggestion(models.Model):
+    '''Автор, которого стоит предложить пользователю: на него
+    подписаны авторы, которых пользователь читает'''
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='follow_suggestions',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Предложенный автор',
+        related_name='suggested_to',
+        on_delete=models.CASCADE,
+    )
+    score = models.PositiveIntegerField(
+        verbose_name='Общих подписок',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow_suggestion"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.author} ({self.score})'
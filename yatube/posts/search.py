@@ -0,0 +1,190 @@
+'''Полнотекстовый поиск по постам и комментариям.
+
+Текст разбивается на слова, слова сводятся к основам, и для каждой
+основы в SearchEntry хранится её вес в посте или комментарии. Индекс
+обновляется при сохранении поста и комментария. Поиск требует всех
+слов запроса и ранжирует посты по сумме весов с поправкой на редкость
+слова (idf), страницы листаются курсором по (score, post_id). Общее
+число постов для idf берётся из кэша и пересчитывается при смене
+поколения ленты.'''
+import base64
+import binascii
+import math
+import re
+from collections import Counter
+
+from django.core.paginator import Page
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, IntegerField, Q, Sum, When,
+)
+
+from core.cache import get_or_refresh
+
+from .cache import feed_version
+from .constants import (
+    CACHE_UPDATE,
+    SEARCH_COMMENT_WEIGHT,
+    SEARCH_IDF_SCALE,
+    SEARCH_MAX_TERMS,
+    SEARCH_POST_WEIGHT,
+    SEARCH_TERM_LENGTH,
+)
+from .models import Post, SearchEntry
+from .stemmer import stem
+from .utils import CursorPaginator, approximate_count
+
+WORD = re.compile(r'\w+')
+POST_TOTAL_KEY = 'search_post_total'
+
+
+def terms(text):
+    '''Основы слов текста с количеством вхождений'''
+    return Counter(
+        stem(word)[:SEARCH_TERM_LENGTH]
+        for word in WORD.findall(text.lower())
+        if len(word) > 1
+    )
+
+
+def post_entries(post):
+    return [
+        SearchEntry(term=term, post_id=post.pk, weight=SEARCH_POST_WEIGHT * n)
+        for term, n in terms(post.text).items()
+    ]
+
+
+def comment_entries(comment):
+    return [
+        SearchEntry(
+            term=term,
+            post_id=comment.post_id,
+            comment_id=comment.pk,
+            weight=SEARCH_COMMENT_WEIGHT * n,
+        )
+        for term, n in terms(comment.text).items()
+    ]
+
+
+def index_post(post):
+    '''Переиндексирует текст поста'''
+    SearchEntry.objects.filter(post=post, comment__isnull=True).delete()
+    SearchEntry.objects.bulk_create(post_entries(post))
+
+
+def index_comment(comment):
+    '''Переиндексирует текст комментария'''
+    SearchEntry.objects.filter(comment=comment).delete()
+    SearchEntry.objects.bulk_create(comment_entries(comment))
+
+
+def encode_search_cursor(score, pk):
+    raw = f'{score}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_search_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        score, pk = base64.urlsafe_b64decode(padded.encode()).decode().split(
+            '|'
+        )
+        return int(score), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def post_total():
+    '''Приблизительное число постов без COUNT(*) на каждый поиск'''
+    return get_or_refresh(
+        POST_TOTAL_KEY,
+        lambda: approximate_count(Post.objects.all()),
+        CACHE_UPDATE,
+        version=feed_version(),
+    )
+
+
+def ranked_hits(query):
+    '''Посты, содержащие все слова запроса, с их рангом'''
+    query_terms = list(terms(query))[:SEARCH_MAX_TERMS]
+    entries = SearchEntry.objects.filter(term__in=query_terms)
+    frequencies = dict(
+        entries.order_by().values_list('term').annotate(
+            posts=Count('post', distinct=True)
+        )
+    )
+    found = query_terms and len(frequencies) == len(query_terms)
+    idf = {}
+    if found:
+        total = max(post_total(), 1)
+        idf = {
+            term: max(int(SEARCH_IDF_SCALE * math.log(1 + total / df)), 1)
+            for term, df in frequencies.items()
+        }
+    hits = entries.values('post').annotate(
+        matched=Count('term', distinct=True),
+        score=Sum(
+            ExpressionWrapper(
+                Case(
+                    *[When(term=term, then=idf[term]) for term in idf],
+                    output_field=IntegerField(),
+                ) * F('weight'),
+                output_field=IntegerField(),
+            )
+        ),
+    ).filter(matched=len(query_terms))
+    return hits if found else hits.none()
+
+
+def matching_comments(query):
+    '''Комментарии, содержащие все слова запроса'''
+    query_terms = list(terms(query))[:SEARCH_MAX_TERMS]
+    return SearchEntry.objects.filter(
+        term__in=query_terms, comment__isnull=False
+    ).values('comment').annotate(
+        matched=Count('term', distinct=True)
+    ).filter(matched=len(query_terms)).values('comment')
+
+
+class SearchPaginator(CursorPaginator):
+    '''Курсорный пагинатор по рангу результатов поиска'''
+
+    ordering = ('-score', '-post_id')
+
+    def get_page(self, cursor):
+        rows = self.object_list
+        position = decode_search_cursor(cursor)
+        if position is not None:
+            score, pk = position
+            rows = rows.filter(
+                Q(score__lt=score) | Q(score=score, post_id__lt=pk)
+            )
+            self.has_previous_page = True
+
+        hits = list(rows[:self.per_page + 1])
+        self.has_next_page = len(hits) > self.per_page
+        hits = hits[:self.per_page]
+        posts = Post.objects.for_feed().in_bulk(
+            [hit['post'] for hit in hits]
+        )
+
+        page = Page(
+            [posts[hit['post']] for hit in hits if hit['post'] in posts],
+            1 + self.has_previous_page,
+            self,
+        )
+        page.previous_cursor = None
+        page.next_cursor = None
+        if hits and self.has_next_page:
+            page.next_cursor = encode_search_cursor(
+                hits[-1]['score'], hits[-1]['post']
+            )
+
+        return page
+
+
+def search_posts(query, cursor, per_page):
+    '''Страница результатов поиска'''
+    paginator = SearchPaginator(ranked_hits(query), per_page)
+    return paginator.get_page(cursor)
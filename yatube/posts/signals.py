@@ -0,0 +1,162 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import (
+    bump_feed_generation,
+    bump_labels_generation,
+    bump_follow_generation,
+    group_cache,
+    post_cache,
+    user_cache,
+)
+from .constants import USER_LABEL_FIELDS
+from .feed import backfill_feed, fan_out_post, followers_dropped, trim_feed
+from .follow_graph import invalidate_following
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .search import index_comment, index_post
+from .stats import bump
+from .thumbnails import delete_renditions, is_stale, schedule_renditions
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    '''Новый пост попадает в ленты подписчиков'''
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    '''Подписка заполняет ленту постами автора'''
+    if created:
+        backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    '''Отписка убирает посты автора из ленты'''
+    trim_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    '''У нового пользователя сразу появляются нулевые счётчики'''
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_count_created(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_count_deleted(sender, instance, **kwargs):
+    bump(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_count_created(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, 'followers_count', 1)
+        bump(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_count_deleted(sender, instance, **kwargs):
+    bump(instance.author_id, 'followers_count', -1)
+    bump(instance.user_id, 'following_count', -1)
+    followers_dropped(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_count_created(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.author_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_count_deleted(sender, instance, **kwargs):
+    bump(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    '''Любое изменение поста сбрасывает закэшированные ленты'''
+    bump_feed_generation()
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    '''Подписка и отписка сбрасывают ленту и список подписок читателя'''
+    bump_follow_generation(instance.user_id)
+    invalidate_following(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def post_image_changed(sender, instance, **kwargs):
+    '''Новая картинка поста отправляется на построение копий'''
+    if is_stale(instance):
+        schedule_renditions(instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def post_image_deleted(sender, instance, **kwargs):
+    '''Вместе с постом удаляются файлы его копий'''
+    renditions = instance.renditions
+    transaction.on_commit(lambda: delete_renditions(renditions))
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, **kwargs):
+    '''Текст поста попадает в поисковый индекс'''
+    index_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_indexed(sender, instance, **kwargs):
+    '''Текст комментария попадает в поисковый индекс'''
+    index_comment(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_cache_invalidated(sender, instance, **kwargs):
+    group_cache.invalidate_on_commit(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_cache_invalidated(sender, instance, **kwargs):
+    user_cache.invalidate_on_commit(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_cache_invalidated(sender, instance, **kwargs):
+    '''Изменённый или удалённый пост пропадает из кэша объектов'''
+    post_cache.invalidate_on_commit(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_labels_changed(sender, instance, created=False, **kwargs):
+    '''Изменённое сообщество меняет шапку и карточки его постов'''
+    if not created:
+        bump_labels_generation()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_labels_changed(sender, instance, created=False, update_fields=None,
+                        **kwargs):
+    '''Имя автора выводится в шапке профиля и в карточках постов,
+    сохранение только last_login его не меняет'''
+    if created:
+        return
+    if update_fields is None or USER_LABEL_FIELDS & set(update_fields):
+        bump_labels_generation()
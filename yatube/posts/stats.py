@@ -0,0 +1,52 @@
+'''Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются атомарными UPDATE из сигналов, недостающая запись
+пересчитывается при первом чтении.'''
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def stats_annotations():
+    '''Выражения для подсчёта всех счётчиков одним запросом'''
+    return {
+        'posts_count': _count(Post, 'author'),
+        'followers_count': _count(Follow, 'author'),
+        'following_count': _count(Follow, 'user'),
+        'comments_count': _count(Comment, 'author'),
+    }
+
+
+def bump(user_id, field, delta):
+    '''Атомарно меняет счётчик, если запись уже существует'''
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def get_user_stats(user):
+    '''Возвращает счётчики пользователя, пересчитывая отсутствующие'''
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        pass
+    counts = type(user).objects.filter(pk=user.pk).annotate(
+        **stats_annotations()
+    ).values(*stats_annotations()).get()
+    stats, _ = UserStats.objects.get_or_create(user=user, defaults=counts)
+    user.stats = stats
+    return stats
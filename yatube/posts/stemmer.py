@@ -0,0 +1,141 @@
+'''Стеммер русского языка по алгоритму Snowball (Porter).'''
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+CYRILLIC = re.compile('^[а-я]+$')
+
+
+def _regions(word):
+    '''Начала областей RV и R2'''
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, endings):
+    '''Отрезает самое длинное окончание, целиком лежащее в области'''
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            return word[:-len(ending)]
+    return None
+
+
+def _strip_grouped(word, start, groups):
+    '''Окончания первой группы отрезаются только после «а» или «я»'''
+    first, second = groups
+    candidates = [(ending, True) for ending in first]
+    candidates += [(ending, False) for ending in second]
+    for ending, after_a in sorted(
+        candidates, key=lambda item: len(item[0]), reverse=True
+    ):
+        if not word.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if len(stem) < start:
+            continue
+        if after_a and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def _strip_adjectival(word, start):
+    stem = _strip(word, start, ADJECTIVE)
+    if stem is None:
+        return None
+    participle = _strip_grouped(stem, start, PARTICIPLE)
+    return stem if participle is None else participle
+
+
+def _strip_inflection(word, rv):
+    '''Шаг 1: деепричастие, либо возвратность и прилагательное,
+    глагол или существительное'''
+    result = _strip_grouped(word, rv, PERFECTIVE_GERUND)
+    if result is not None:
+        return result
+    reflexive = _strip(word, rv, REFLEXIVE)
+    if reflexive is not None:
+        word = reflexive
+    result = _strip_adjectival(word, rv)
+    if result is None:
+        result = _strip_grouped(word, rv, VERB)
+    if result is None:
+        result = _strip(word, rv, NOUN)
+    return word if result is None else result
+
+
+def _tidy_up(word, rv):
+    '''Шаг 4: «нн», превосходная степень или мягкий знак'''
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        if superlative.endswith('нн') and len(superlative) - 1 >= rv:
+            return superlative[:-1]
+        return superlative
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        return word[:-1]
+    return word
+
+
+def stem(word):
+    '''Основа русского слова, остальные слова возвращаются как есть'''
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+    rv, r2 = _regions(word)
+
+    word = _strip_inflection(word, rv)
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    derivational = _strip(word, r2, DERIVATIONAL)
+    if derivational is not None:
+        word = derivational
+
+    return _tidy_up(word, rv)
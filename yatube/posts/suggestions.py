@@ -0,0 +1,87 @@
+'''Предложения авторов: «на них подписаны те, кого вы читаете».
+
+Таблица подписок загружается в сжатое построчное представление
+(CSR): массив id читателей, смещения их строк и общий массив id
+авторов, всё - 32-битные целые из модуля array. Оценка автора для
+пользователя - число путей длины два через его подписки, то есть
+строка произведения матрицы смежности на саму себя. Строка
+считается подсчётом срезов массива в Counter, без запросов к базе.
+Лучшие предложения сохраняются в FollowSuggestion и читаются
+боковой колонкой профиля одним запросом.'''
+import heapq
+from array import array
+from collections import Counter
+
+from .constants import SUGGESTIONS_LIMIT
+from .follow_graph import follow_graph
+from .models import Follow, FollowSuggestion
+
+
+class FollowMatrix:
+    '''Матрица смежности подписок в формате CSR'''
+
+    def __init__(self, chunk_size):
+        self.users = array('i')
+        self.indptr = array('i', [0])
+        self.indices = array('i')
+        self.rows = {}
+        follows = Follow.objects.order_by('user_id', 'author_id')
+        current = None
+        for user_id, author_id in follows.values_list(
+            'user_id', 'author_id'
+        ).iterator(chunk_size=chunk_size):
+            if user_id != current:
+                if current is not None:
+                    self.indptr.append(len(self.indices))
+                self.rows[user_id] = len(self.users)
+                self.users.append(user_id)
+                current = user_id
+            self.indices.append(author_id)
+        if current is not None:
+            self.indptr.append(len(self.indices))
+
+    def following(self, user_id):
+        '''Срез массива авторов, на которых подписан пользователь'''
+        row = self.rows.get(user_id)
+        if row is None:
+            return self.indices[:0]
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def scores(self, user_id):
+        '''Число подписок пользователя, подписанных на каждого автора'''
+        followed = self.following(user_id)
+        counts = Counter()
+        for author_id in followed:
+            counts.update(self.following(author_id))
+        counts.pop(user_id, None)
+        for author_id in followed:
+            counts.pop(author_id, None)
+        return counts
+
+
+def build_suggestions(matrix, user_ids, limit=SUGGESTIONS_LIMIT):
+    '''FollowSuggestion с лучшими авторами для читателей user_ids'''
+    for user_id in user_ids:
+        best = heapq.nlargest(
+            limit,
+            matrix.scores(user_id).items(),
+            key=lambda item: (item[1], -item[0]),
+        )
+        for author_id, score in best:
+            yield FollowSuggestion(
+                user_id=user_id, author_id=author_id, score=score
+            )
+
+
+def suggested_authors(request):
+    '''Предложения для зрителя без уже прочитанных авторов'''
+    if not request.user.is_authenticated:
+        return []
+    graph = follow_graph(request)
+    suggestions = FollowSuggestion.objects.filter(
+        user=request.user
+    ).select_related('author').order_by('-score', 'author_id')
+    return [
+        suggestion for suggestion in suggestions[:SUGGESTIONS_LIMIT]
+        if not graph.is_following(suggestion.author_id)
+    ]
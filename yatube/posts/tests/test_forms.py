@@ -5,9 +5,11 @@ from django.test import Client, TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.conf import settings
+from django.core.management import call_command
 
 from posts.models import Post, Group, Comment, User
 from posts.forms import PostForm
+from posts.constants import POST_IMAGE_RENDITIONS
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -115,6 +117,39 @@ class FormPostTests(TestCase):
             ).exists()
         )
 
+    def test_image_renditions_are_prepared_for_templates(self):
+        '''Копии картинки строятся воркером и попадают в ленту'''
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='rendition.gif',
+                content=small_gif,
+                content_type='image/gif',
+            ),
+        )
+        self.assertEqual(post.image_renditions, {})
+
+        call_command('runworker', burst=True)
+
+        post.refresh_from_db()
+        renditions = post.image_renditions
+        for name in ('feed', 'detail', 'retina'):
+            with self.subTest(name=name):
+                width, height, _ = POST_IMAGE_RENDITIONS[name]
+                self.assertEqual(renditions[name]['width'], width)
+                self.assertEqual(renditions[name]['height'], height)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, renditions['feed']['url'])
+
 
 class StaticCommentTest(TestCase):
     '''Класс для тестирования комментариев'''
@@ -1,7 +1,12 @@
+from unittest import mock, skipUnless
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..feed import feed_sources
+from ..models import Follow, Group, Post
+from ..utils import CursorPaginator, keyset
 from posts.constants import STRING_LENGHT_LIMIT
 
 User = get_user_model()
@@ -37,3 +42,64 @@ class PostModelTest(TestCase):
                     expected_value, str(model),
                     'метод __str__ работает не верно'
                 )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class IndexUsageTest(TestCase):
+    '''Проверяем по EXPLAIN, что ленты читаются по индексам'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='БАГульники',
+            slug='test-slug',
+            description='Кто ищёт - тот найдёт!',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Какой-то текст,'
+        )
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент используют составные индексы без сортировки."""
+        ordering = CursorPaginator.ordering
+        queries = {
+            'post_pub_date_idx': Post.objects.for_feed(),
+            'post_author_pub_date_idx': self.user.posts.for_feed(),
+            'post_group_pub_date_idx': self.group.posts.for_feed(),
+        }
+        queries = {
+            index: queryset.order_by(*ordering)
+            for index, queryset in queries.items()
+        }
+        queries['comment_post_created_idx'] = self.post.comments.all()
+        queries['follow_author_user_idx'] = Follow.objects.filter(
+            author=self.user
+        ).values_list('user', flat=True)
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                plan = queryset[:10].explain()
+                self.assertIn(f'INDEX {index}', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_feed_queries_use_indexes(self):
+        """Страница ленты подписок читает записи ленты и посты
+        популярного автора по индексам без сортировки."""
+        position = (False, self.post.pub_date, self.post.pk)
+        indexes = ('feed_user_pub_date_idx', 'post_author_pub_date_idx')
+        with mock.patch('posts.feed.FANOUT_FOLLOWERS_LIMIT', -1):
+            Follow.objects.create(user=self.reader, author=self.user)
+            sources = list(feed_sources(self.reader))
+        self.assertEqual(len(sources), 2)
+        for index, (rows, key) in zip(indexes, sources):
+            for cursor in (None, position):
+                with self.subTest(index=index, cursor=cursor):
+                    plan = keyset(rows, cursor, key).values_list(
+                        'pub_date', key
+                    )[:10].explain()
+                    self.assertIn(f'INDEX {index}', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
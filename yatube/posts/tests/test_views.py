@@ -1,12 +1,35 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django.test import TestCase, Client
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
-
-from ..models import Group, Post, Follow, Comment, User
+from django.core.paginator import InvalidPage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import (
+    Group, Post, Follow, FollowSuggestion, Comment, FeedEntry, SearchEntry,
+    User, UserStats,
+)
+from core.cache import MISSING
+
+from ..cache import bump_feed_generation
 from ..constants import COUNT_POSTS_LIMIT_1, COUNT_POSTS_LIMIT_2
+from ..follow_graph import FollowGraph
+from ..suggestions import FollowMatrix
+from ..transfer import save_batch
+from ..utils import CursorPaginator, encode_cursor
 
 
 class StaticURLTests(TestCase):
@@ -310,6 +333,61 @@ class PaginatorViewsTest(TestCase):
                         COUNT_POSTS_LIMIT_2,
                     )
 
+    def test_cursor_pages_walk_the_feed_without_gaps(self):
+        '''Курсорная пагинация проходит ленту вперёд и назад
+        без пропусков и повторов'''
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+
+        second = self.client.get(
+            reverse('posts:index'), {'cursor': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second), COUNT_POSTS_LIMIT_2)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        self.assertFalse(
+            {post.id for post in first} & {post.id for post in second}
+        )
+
+        back = self.client.get(
+            reverse('posts:index'), {'cursor': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.id for post in back], [post.id for post in first]
+        )
+
+    def test_cursor_past_newest_post_has_no_links(self):
+        '''Курсор назад от самого свежего поста даёт пустую страницу
+        без ссылок на соседние страницы'''
+        cache.clear()
+        newest = Post.objects.order_by('-pub_date', '-pk').first()
+        response = self.client.get(
+            reverse('posts:index'),
+            {'cursor': encode_cursor(newest, reverse=True)},
+        )
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_other_pages())
+        self.assertNotContains(response, 'cursor=None')
+
+    def test_cursor_paginator_has_no_numbered_pages(self):
+        '''По номеру открывается только первая страница'''
+        paginator = CursorPaginator(Post.objects.all(), COUNT_POSTS_LIMIT_1)
+        self.assertEqual(len(paginator.page(1)), COUNT_POSTS_LIMIT_1)
+        with self.assertRaises(InvalidPage):
+            paginator.page(2)
+
+    def test_broken_cursor_returns_first_page(self):
+        '''Битый курсор открывает первую страницу'''
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            len(response.context['page_obj']), COUNT_POSTS_LIMIT_1
+        )
+
 
 class StaticCacheTest(TestCase):
     '''Класс для тестирования кэша'''
@@ -337,21 +415,45 @@ class StaticCacheTest(TestCase):
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
+    def test_feeds_not_stale_after_new_post(self):
+        '''Пока другой процесс держит блокировку перерисовки, группа,
+        профиль и подписки не отдают страницу без нового поста'''
+        Follow.objects.create(user=self.author, author=self.user)
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        )
+        cache.clear()
+        for url in urls:
+            self.author_client.get(url)
+        Post.objects.create(
+            author=self.user, group=self.group, text='Свежий пост'
+        )
+
+        with mock.patch.object(cache, 'add', return_value=False), \
+                mock.patch('core.cache.wait_for', return_value=MISSING):
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.author_client.get(url)
+                    self.assertContains(response, 'Свежий пост')
+
     def test_to_check_the_cache_operation(self):
-        '''Проверка работы кэша'''
+        '''Проверка работы кэша: без записей страница берётся из кэша'''
+        cache.clear()
         response = self.authorized_client.get(
             reverse('posts:index')
         )
         posts = response.content
 
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Обновлённый пост')
 
         response = self.authorized_client.get(
             reverse('posts:index')
         )
-        outdated_posts = response.content
+        cached_posts = response.content
 
-        self.assertEqual(outdated_posts, posts)
+        self.assertEqual(cached_posts, posts)
 
         cache.clear()
 
@@ -360,7 +462,68 @@ class StaticCacheTest(TestCase):
         )
         updated_posts = response.content
 
-        self.assertNotEqual(updated_posts, outdated_posts)
+        self.assertNotEqual(updated_posts, cached_posts)
+
+    def test_write_invalidates_cached_feeds(self):
+        '''Изменение и удаление поста сразу видны во всех лентах'''
+        cache.clear()
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ]
+        for url in pages:
+            self.authorized_client.get(url)
+
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Отредактированный пост')
+
+        self.post.delete()
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Отредактированный пост')
+
+    def test_index_page_served_from_cache(self):
+        '''Повторный запрос главной не обращается к базе'''
+        cache.clear()
+        guest_client = Client()
+        guest_client.get(reverse('posts:index'))
+
+        with self.assertNumQueries(0):
+            response = guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+
+    def test_post_cards_fetched_in_one_lookup(self):
+        '''Карточки страницы берутся из кэша одним запросом get_many'''
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.authorized_client.get(url)
+        bump_feed_generation()
+
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many:
+            response = self.authorized_client.get(url)
+
+        self.assertContains(response, self.post.text)
+        get_many.assert_called_once()
+
+    def test_group_rename_refreshes_cards(self):
+        '''Карточка с названием группы перерисовывается после
+        переименования группы'''
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+
+        self.assertContains(response, 'Переименованная группа')
 
 
 class StaticFollowTest(TestCase):
@@ -497,3 +660,824 @@ class StaticFollowTest(TestCase):
                 kwargs={'username': self.author}
             )
         )
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        '''Новый пост раскладывается в ленты подписчиков'''
+        post = Post.objects.create(author=self.author, text='Свежий пост')
+
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    def test_unsubscribe_trims_materialized_feed(self):
+        '''Отписка убирает посты автора из ленты'''
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.author}
+            )
+        )
+
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+    @mock.patch('posts.feed.FANOUT_SYNC_LIMIT', 0)
+    def test_large_fan_out_goes_through_task_queue(self):
+        '''Раскладка по многим лентам выполняется воркером'''
+        post = Post.objects.create(author=self.author, text='Для многих')
+
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        call_command('runworker', burst=True)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    @mock.patch('posts.feed.FANOUT_FOLLOWERS_LIMIT', 0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        '''Посты популярного автора не раскладываются,
+        но попадают в ленту при чтении'''
+        post = Post.objects.create(author=self.author, text='Для всех')
+
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    @mock.patch('posts.feed.FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_posts_backfilled_when_author_drops_below_limit(self):
+        '''Посты, опубликованные выше порога, раскладываются по лентам,
+        когда автор перестаёт быть популярным'''
+        other = User.objects.create_user(username='other')
+        follow = Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Выше порога')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+        follow.delete()
+        call_command('runworker', burst=True)
+
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+
+    @mock.patch('posts.views.LIMIT_COUNTS_POSTS', 2)
+    @mock.patch('posts.feed.FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_follow_feed_pages_merge_sources(self):
+        '''Страницы ленты подписок сливают записи ленты и посты
+        популярного автора в порядке публикации'''
+        cache.clear()
+        star = User.objects.create_user(username='star')
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user, author=star)
+        Follow.objects.create(user=other, author=star)
+        for number, author in enumerate((star, self.author, star, star)):
+            Post.objects.create(author=author, text=f'Пост {number}')
+        self.assertFalse(FeedEntry.objects.filter(author=star).exists())
+        expected = list(Post.objects.filter(author__in=(self.author, star)))
+        url = reverse('posts:follow_index')
+
+        seen = []
+        response = self.authorized_client.get(url)
+        while True:
+            page = response.context['page_obj']
+            seen.extend(page)
+            if not page.next_cursor:
+                break
+            response = self.authorized_client.get(
+                url, {'cursor': page.next_cursor}
+            )
+        self.assertEqual(seen, expected)
+
+        response = self.authorized_client.get(
+            url, {'cursor': page.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), expected[2:4])
+
+
+class StaticFollowGraphTest(TestCase):
+    '''Класс тестирования графа подписок зрителя'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(5)
+        ]
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_many_authors_in_one_query(self):
+        '''Подписка на любое число авторов проверяется одним запросом,
+        повторно - из кэша'''
+        with self.assertNumQueries(1):
+            graph = FollowGraph(self.reader)
+            following = [graph.is_following(a) for a in self.authors]
+        self.assertEqual(following, [True, True, True, False, False])
+
+        with self.assertNumQueries(0):
+            graph = FollowGraph(self.reader)
+            self.assertIn(self.authors[0].pk, graph)
+
+    def test_follow_and_unfollow_invalidate(self):
+        '''Подписка и отписка сразу меняют граф'''
+        FollowGraph(self.reader).following
+        author = self.authors[4]
+
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': author})
+        )
+        self.assertTrue(FollowGraph(self.reader).is_following(author))
+
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': author})
+        )
+        self.assertFalse(FollowGraph(self.reader).is_following(author))
+
+    def test_graph_in_templates(self):
+        '''Граф подписок доступен шаблонам, анониму - пустой'''
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn(self.authors[0], response.context['follow_graph'])
+
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn(self.authors[0], response.context['follow_graph'])
+
+
+class StaticSuggestionsTest(TestCase):
+    '''Класс тестирования предложений авторов'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.a, cls.b, cls.c, cls.d = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'a', 'b', 'c', 'd')
+        ]
+        graph = (
+            (cls.reader, cls.a), (cls.reader, cls.b),
+            (cls.a, cls.c), (cls.a, cls.d), (cls.a, cls.reader),
+            (cls.b, cls.c), (cls.b, cls.a),
+        )
+        for user, author in graph:
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_matrix_rows(self):
+        '''Строки CSR - подписки пользователей по возрастанию id'''
+        matrix = FollowMatrix(chunk_size=2)
+
+        self.assertEqual(
+            list(matrix.following(self.a.pk)),
+            sorted([self.c.pk, self.d.pk, self.reader.pk]),
+        )
+        self.assertEqual(list(matrix.following(self.d.pk)), [])
+        self.assertEqual(
+            matrix.scores(self.reader.pk), {self.c.pk: 2, self.d.pk: 1}
+        )
+
+    def test_command_stores_top_suggestions(self):
+        '''Команда сохраняет лучших авторов без себя и подписок'''
+        call_command(
+            'build_follow_suggestions', limit=1, stdout=StringIO()
+        )
+
+        suggestions = FollowSuggestion.objects.filter(user=self.reader)
+        self.assertEqual(
+            list(suggestions.values_list('author', 'score')),
+            [(self.c.pk, 2)],
+        )
+
+    def test_command_replaces_stale_suggestions(self):
+        '''Повторный запуск по пачкам заменяет предложения и удаляет
+        их у пользователей без подписок'''
+        call_command(
+            'build_follow_suggestions', batch_size=1, stdout=StringIO()
+        )
+        Follow.objects.filter(user=self.b).delete()
+        Follow.objects.create(user=self.reader, author=self.c)
+
+        call_command(
+            'build_follow_suggestions', batch_size=1, stdout=StringIO()
+        )
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.b))
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(
+                user=self.reader
+            ).values_list('author', 'score')),
+            [(self.d.pk, 1)],
+        )
+
+    def test_profile_sidebar(self):
+        '''Колонка профиля показывает предложения, пока зритель
+        не подписался на автора'''
+        call_command('build_follow_suggestions', stdout=StringIO())
+        url = reverse('posts:profile', kwargs={'username': self.a})
+
+        response = self.client.get(url)
+        self.assertEqual(
+            [s.author for s in response.context['suggestions']],
+            [self.c, self.d],
+        )
+
+        Follow.objects.create(user=self.reader, author=self.c)
+        response = self.client.get(url)
+        self.assertEqual(
+            [s.author for s in response.context['suggestions']], [self.d]
+        )
+
+
+class StaticUserStatsTest(TestCase):
+    '''Класс тестирования денормализованных счётчиков'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_stats(self):
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': self.author})
+        )
+        return response.context['stats']
+
+    def test_counters_follow_writes(self):
+        '''Счётчики меняются при подписке, комментарии и новом посте'''
+        self.assertEqual(self.get_stats().posts_count, 1)
+
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'},
+        )
+        Post.objects.create(author=self.author, text='Ещё пост')
+
+        stats = self.get_stats()
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        reader_stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+
+    def test_rebuild_user_stats_command(self):
+        '''Команда пересчитывает счётчики всех пользователей'''
+        UserStats.objects.filter(user=self.author).update(posts_count=100)
+        UserStats.objects.filter(user=self.user).delete()
+
+        call_command('rebuild_user_stats', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(UserStats.objects.count(), User.objects.count())
+        self.assertEqual(self.get_stats().posts_count, 1)
+
+
+class StaticQueryCountTest(TestCase):
+    '''Класс тестирования количества запросов к базе'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(COUNT_POSTS_LIMIT_1 + COUNT_POSTS_LIMIT_2):
+            Post.objects.create(
+                author=cls.authors[i % len(cls.authors)],
+                group=cls.group,
+                text=f'{i} тестовый текст',
+            )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+        cls.post = Post.objects.first()
+        for i in range(COUNT_POSTS_LIMIT_1):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.authors[i % len(cls.authors)],
+                text=f'{i} комментарий',
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_pages_use_fixed_number_of_queries(self):
+        '''Количество запросов не зависит от числа постов
+        и комментариев на странице (включая запрос свежести страницы)'''
+        pages = {
+            reverse('posts:index'): 4,
+            reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ): 5,
+            reverse(
+                'posts:profile', kwargs={'username': self.authors[0]}
+            ): 8,
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ): 6,
+            # записи ленты, популярные авторы из подписок и посты по id
+            reverse('posts:follow_index'): 5,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.authorized_client.get(url)
+
+    def test_point_lookups_served_from_object_cache(self):
+        '''Группа, автор и пост повторно берутся из кэша объектов'''
+        pages = {
+            reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ): ('posts_group', 'slug'),
+            reverse(
+                'posts:profile', kwargs={'username': self.authors[0]}
+            ): ('auth_user', 'username'),
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ): ('posts_post', 'id'),
+        }
+        for url, (table, field) in pages.items():
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                bump_feed_generation()
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                lookups = [
+                    query['sql'] for query in queries
+                    if query['sql'].startswith(f'SELECT "{table}"."id"')
+                    and f'WHERE "{table}"."{field}" =' in query['sql']
+                ]
+                self.assertEqual(lookups, [])
+
+
+class StaticSearchTest(TestCase):
+    '''Класс тестирования полнотекстового поиска'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Кошки гуляют по крышам, кошка спит',
+        )
+        cls.cat = Post.objects.create(author=cls.author, text='Кошка спит')
+        cls.dog = Post.objects.create(author=cls.author, text='Собака лает')
+        Comment.objects.create(
+            post=cls.dog, author=cls.author, text='Крокодилы не лают',
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response.context['page_obj']
+
+    def test_search_matches_word_forms_and_ranks(self):
+        '''Поиск находит формы слова и ставит выше частое вхождение'''
+        self.assertEqual(list(self.search('кошками')), [self.cats, self.cat])
+        self.assertEqual(list(self.search('кошка гуляла')), [self.cats])
+        self.assertEqual(list(self.search('жираф')), [])
+
+    def test_post_total_is_cached(self):
+        '''Число постов для idf не считается на каждый поиск'''
+        cache.clear()
+        with mock.patch(
+            'posts.search.approximate_count', return_value=3
+        ) as count:
+            self.search('кошка')
+            self.search('собака')
+
+        self.assertEqual(count.call_count, 1)
+
+    def test_search_covers_comments(self):
+        '''Пост находится по тексту своих комментариев'''
+        self.assertEqual(list(self.search('крокодилы')), [self.dog])
+
+    def test_search_pages_with_cursor(self):
+        '''Результаты листаются курсором без повторов'''
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'{i} кошка')
+            for i in range(COUNT_POSTS_LIMIT_1)
+        )
+        call_command('reindex', stdout=StringIO())
+
+        first = self.search('кошка')
+        second = self.search('кошка', cursor=first.next_cursor)
+
+        self.assertEqual(len(first), COUNT_POSTS_LIMIT_1)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(first) & set(second))
+
+
+class StaticConditionalGetTest(TestCase):
+    '''Класс тестирования условных запросов к страницам'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Тестовый текст',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_unchanged_pages_return_304(self):
+        '''Повторный запрос неизменившейся страницы получает 304
+        без запросов к постам: остаётся только счётчик автора'''
+        urls = {
+            reverse('posts:index'): 0,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 0,
+            reverse('posts:profile', kwargs={'username': self.author}): 1,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                with self.assertNumQueries(queries):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_depends_on_viewer(self):
+        '''Страница пользователя не совпадает со страницей анонима
+        и не кэшируется общими кэшами'''
+        url = reverse('posts:index')
+        guest = self.guest_client.get(url)
+        reader = self.reader_client.get(url)
+
+        self.assertNotEqual(guest['ETag'], reader['ETag'])
+        self.assertIn('private', reader['Cache-Control'])
+
+    def test_new_post_changes_feed(self):
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+
+        Post.objects.create(author=self.author, text='Новый пост')
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_new_comment_changes_post_detail(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_new_login_changes_post_detail(self):
+        '''Новый вход меняет CSRF-токен формы комментария и ETag'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.reader_client.get(url)
+        etag = self.reader_client.get(url)['ETag']
+
+        self.reader_client.logout()
+        self.reader_client.force_login(self.reader)
+
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_changes_profile(self):
+        '''Подписка меняет кнопку на профиле и его ETag'''
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        etag = self.reader_client.get(url)['ETag']
+
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_rename_changes_group_and_profile(self):
+        '''Новое название сообщества и имя автора сбрасывают ETag'''
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': self.author}
+        )
+        group_etag = self.guest_client.get(group_url)['ETag']
+        profile_etag = self.guest_client.get(profile_url)['ETag']
+
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.guest_client.get(
+            group_url, HTTP_IF_NONE_MATCH=group_etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Новое название')
+
+        self.author.first_name = 'Лев'
+        self.author.save()
+        response = self.guest_client.get(
+            profile_url, HTTP_IF_NONE_MATCH=profile_etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_login_keeps_etag(self):
+        '''Обновление last_login при входе не сбрасывает страницы'''
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+
+        self.reader.last_login = timezone.now()
+        self.reader.save(update_fields=['last_login'])
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class StaticTransferTest(TestCase):
+    '''Класс тестирования выгрузки и загрузки постов'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.date = timezone.now() - timedelta(days=3)
+        for i in range(3):
+            post = Post.objects.create(
+                author=cls.author,
+                text=f'Перенесённый пост {i}',
+                group=cls.group if i else None,
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=cls.date + timedelta(minutes=i)
+            )
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def round_trip(self, name):
+        path = os.path.join(self.directory, name)
+        call_command('export_posts', path, stdout=StringIO())
+        Post.objects.all().delete()
+        call_command(
+            'import_posts', path, batch_size=2, stdout=StringIO()
+        )
+        return path
+
+    def test_export_ndjson_in_pub_date_order(self):
+        '''Выгрузка идёт от старых постов к новым'''
+        path = os.path.join(self.directory, 'posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+
+        with open(path, encoding='utf-8') as stream:
+            records = [json.loads(line) for line in stream]
+        self.assertEqual(
+            [record['text'] for record in records],
+            [f'Перенесённый пост {i}' for i in range(3)],
+        )
+        self.assertEqual(records[0]['group'], '')
+        self.assertEqual(records[1]['group'], self.group.slug)
+
+    def test_round_trip(self):
+        '''Посты переносятся с датами, группами и производными данными'''
+        for name in ('posts.ndjson', 'posts.csv'):
+            with self.subTest(name=name):
+                self.round_trip(name)
+
+                posts = Post.objects.order_by('pub_date')
+                self.assertEqual(posts.count(), 3)
+                self.assertEqual(posts[0].pub_date, self.date)
+                self.assertIsNone(posts[0].group)
+                self.assertEqual(posts[2].group, self.group)
+                self.assertEqual(
+                    FeedEntry.objects.filter(user=self.reader).count(), 3
+                )
+                self.assertTrue(
+                    SearchEntry.objects.filter(post=posts[0]).exists()
+                )
+                self.assertEqual(
+                    UserStats.objects.get(user=self.author).posts_count, 3
+                )
+
+    def test_images_copied(self):
+        '''Картинки выгружаются в каталог и загружаются из него'''
+        media = os.path.join(self.directory, 'export')
+        path = os.path.join(self.directory, 'posts.ndjson')
+        with self.settings(MEDIA_ROOT=os.path.join(self.directory, 'old')):
+            name = default_storage.save('posts/pic.gif', ContentFile(b'gif'))
+            Post.objects.update(image=name)
+            call_command(
+                'export_posts', path, media_dir=media, stdout=StringIO()
+            )
+        Post.objects.all().delete()
+        with self.settings(MEDIA_ROOT=os.path.join(self.directory, 'new')):
+            call_command(
+                'import_posts', path, media_dir=media, stdout=StringIO()
+            )
+            post = Post.objects.first()
+            self.assertTrue(default_storage.exists(post.image.name))
+        self.assertEqual(Post.objects.filter(image=name).count(), 3)
+
+    def test_unknown_author_skipped(self):
+        '''Посты неизвестных авторов не загружаются'''
+        path = os.path.join(self.directory, 'posts.ndjson')
+        record = {
+            'author': 'nobody',
+            'group': '',
+            'text': 'Чужой пост',
+            'pub_date': self.date.isoformat(),
+            'image': '',
+        }
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(json.dumps(record) + '\n')
+        out = StringIO()
+
+        call_command('import_posts', path, stdout=out)
+
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertIn('пропущено: 1', out.getvalue())
+
+    def test_comments_and_follows_round_trip(self):
+        '''Комментарии находят свои посты, подписки - ленты и счётчики'''
+        post = Post.objects.get(text='Перенесённый пост 1')
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий читателя'
+        )
+        paths = {
+            name: os.path.join(self.directory, f'{name}.csv')
+            for name in ('posts', 'comments', 'follows')
+        }
+        call_command(
+            'export_posts', paths['posts'], comments=paths['comments'],
+            follows=paths['follows'], stdout=StringIO(),
+        )
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+        call_command(
+            'import_posts', paths['posts'], comments=paths['comments'],
+            follows=paths['follows'], batch_size=2, stdout=StringIO(),
+        )
+
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post.text, 'Перенесённый пост 1')
+        self.assertTrue(
+            SearchEntry.objects.filter(comment=comment).exists()
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists()
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 3
+        )
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).comments_count, 1
+        )
+
+    def test_posts_written_during_import_not_rebuilt(self):
+        '''Пост, опубликованный на сайте во время загрузки, не получает
+        второй счётчик и второй поисковый индекс'''
+        path = os.path.join(self.directory, 'posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        written = []
+
+        def publish_then_save(*args):
+            if not written:
+                written.append(Post.objects.create(
+                    author=self.author,
+                    text='Новость с сайта',
+                    pub_date=timezone.now(),
+                ))
+            return save_batch(*args)
+
+        with mock.patch(
+            'posts.management.commands.import_posts.save_batch',
+            publish_then_save,
+        ):
+            call_command(
+                'import_posts', path, batch_size=2, stdout=StringIO()
+            )
+
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 7
+        )
+        self.assertEqual(
+            SearchEntry.objects.filter(post=written[0]).count(), 2
+        )
+
+
+class StaticArchiveTest(TestCase):
+    '''Класс тестирования архива сообщества и автора'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(COUNT_POSTS_LIMIT_1 + COUNT_POSTS_LIMIT_2):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Архивный {i}'
+            )
+        Post.objects.create(author=cls.other, text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_archive(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_group_archive_streams_all_posts(self):
+        '''Архив сообщества содержит все его посты, новые сверху'''
+        content = self.get_archive(
+            reverse('posts:group_archive', kwargs={'slug': self.group.slug})
+        )
+
+        total = COUNT_POSTS_LIMIT_1 + COUNT_POSTS_LIMIT_2
+        for i in range(total):
+            self.assertIn(f'Архивный {i}', content)
+        self.assertLess(
+            content.index(f'Архивный {total - 1}'),
+            content.index('Архивный 0'),
+        )
+        self.assertNotIn('Пост без группы', content)
+        self.assertTrue(content.rstrip().endswith('</html>'))
+
+    def test_profile_archive_streams_author_posts(self):
+        '''Архив автора содержит только его посты'''
+        content = self.get_archive(
+            reverse('posts:profile_archive', kwargs={'username': 'other'})
+        )
+
+        self.assertIn('Пост без группы', content)
+        self.assertNotIn('Архивный', content)
+
+    def test_archive_not_found(self):
+        '''Архив несуществующего сообщества или автора - 404'''
+        urls = (
+            reverse('posts:group_archive', kwargs={'slug': 'missing'}),
+            reverse('posts:profile_archive', kwargs={'username': 'missing'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_archive_not_modified(self):
+        '''Повторный запрос архива с ETag получает 304'''
+        url = reverse('posts:group_archive', kwargs={'slug': self.group.slug})
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,91 @@
+'''Заранее подготовленные производные изображения поста.
+
+После сохранения поста с новой картинкой её копии нужных размеров
+строятся воркером очереди задач. Пути и размеры копий хранятся в
+Post.renditions, поэтому шаблоны не трогают Pillow во время запроса.'''
+import json
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from core.instrumentation import timer
+from core.tasks import task
+
+from .cache import bump_feed_generation, post_cache
+from .constants import (
+    POST_IMAGE_RENDITIONS,
+    RENDITIONS_QUALITY,
+    RENDITIONS_UPLOAD_TO,
+)
+from .models import Post, parse_renditions
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def is_stale(post):
+    '''Копии построены не для текущей картинки поста'''
+    source = parse_renditions(post.renditions).get('source', '')
+    return source != post.image.name
+
+
+def schedule_renditions(post_id):
+    '''Ставит построение копий в очередь фоновых задач'''
+    render_post_images.delay(post_id)
+
+
+def _supported(image_format):
+    return image_format != 'WEBP' or features.check('webp')
+
+
+def delete_renditions(renditions):
+    '''Удаляет файлы копий'''
+    for name, rendition in parse_renditions(renditions).items():
+        if name != 'source' and isinstance(rendition, dict):
+            default_storage.delete(rendition['path'])
+
+
+def _render(post):
+    renditions = {}
+    with post.image.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGB')
+    for name, (width, height, image_format) in POST_IMAGE_RENDITIONS.items():
+        if not _supported(image_format):
+            continue
+        rendition = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        buffer = BytesIO()
+        rendition.save(buffer, image_format, quality=RENDITIONS_QUALITY)
+        path = default_storage.save(
+            f'{RENDITIONS_UPLOAD_TO}{post.pk}/'
+            f'{name}.{EXTENSIONS[image_format]}',
+            ContentFile(buffer.getvalue()),
+        )
+        renditions[name] = {'path': path, 'width': width, 'height': height}
+    return renditions
+
+
+@task
+def render_post_images(post_id):
+    '''Строит все копии картинки поста и сохраняет их пути и размеры'''
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'image', 'renditions'
+    ).first()
+    if post is None or not is_stale(post):
+        return
+    delete_renditions(post.renditions)
+    renditions = {'source': post.image.name}
+    if post.image:
+        with timer('thumbnail'):
+            renditions.update(_render(post))
+    updated = Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        renditions=json.dumps(renditions),
+        updated=timezone.now(),
+    )
+    if updated:
+        post_cache.invalidate_on_commit(post)
+        bump_feed_generation()
+    else:
+        delete_renditions(json.dumps(renditions))
@@ -0,0 +1,267 @@
+'''Перенос постов, комментариев и подписок между базами: выгрузка
+и загрузка NDJSON и CSV.
+
+Записи читаются и пишутся по одной, поэтому расход памяти не зависит
+от размера файла. Пользователи и группа записываются как username
+и slug и при загрузке разрешаются словарями на каждую пачку. Пост
+выгружается со своим id, по которому на него ссылаются комментарии.
+Картинки лежат в отдельном каталоге под своими именами из хранилища
+и копируются пулом потоков.
+
+Загрузка идёт через bulk_create мимо сигналов, поэтому производные
+данные строятся здесь же и только для записанных объектов: пачка
+знает pk своих строк, а не берёт все строки новее отметки.'''
+import csv
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import bump_feed_generation, bump_follow_generation
+from .feed import backfill_feed
+from .follow_graph import invalidate_following
+from .models import Comment, Follow, Post, SearchEntry
+from .search import comment_entries, post_entries
+from .stats import bump
+from .thumbnails import schedule_renditions
+
+FORMATS = ('ndjson', 'csv')
+FIELDS = ('id', 'author', 'group', 'text', 'pub_date', 'image')
+COMMENT_FIELDS = ('post', 'author', 'text', 'created')
+FOLLOW_FIELDS = ('user', 'author')
+
+
+class manual_dates:
+    '''Разрешает задавать даты, которые обычно ставит auto_now_add'''
+
+    FIELDS = ((Post, 'pub_date'), (Comment, 'created'))
+
+    def __enter__(self):
+        for model, name in self.FIELDS:
+            model._meta.get_field(name).auto_now_add = False
+
+    def __exit__(self, *exc):
+        for model, name in self.FIELDS:
+            model._meta.get_field(name).auto_now_add = True
+
+
+class PostSources:
+    '''Соответствие id постов из файла их новым pk для комментариев.
+
+    Хранится во временной таблице соединения, а не в словаре, чтобы
+    память загрузки не росла с размером файла. Комментарии ищут
+    свои посты запросом на пачку.'''
+
+    TABLE = 'import_post_sources'
+
+    def _execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def __enter__(self):
+        self._execute(
+            f'CREATE TEMPORARY TABLE {self.TABLE} '
+            '(source TEXT NOT NULL, post_id INTEGER NOT NULL)'
+        )
+        self._execute(
+            f'CREATE INDEX {self.TABLE}_source ON {self.TABLE} (source)'
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self._execute(f'DROP TABLE {self.TABLE}')
+
+    def add(self, pairs):
+        '''Запоминает пары (id в файле, pk записанного поста)'''
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.TABLE} (source, post_id) '
+                'VALUES (%s, %s)',
+                pairs,
+            )
+
+    def get(self, sources):
+        '''pk постов по их id в файле'''
+        sources = list(set(sources))
+        if not sources:
+            return {}
+        placeholders = ', '.join(['%s'] * len(sources))
+        return dict(self._execute(
+            f'SELECT source, post_id FROM {self.TABLE} '
+            f'WHERE source IN ({placeholders})',
+            sources,
+        ))
+
+
+def file_format(path, fmt=None):
+    '''Формат файла: заданный явно или по расширению'''
+    return fmt or ('csv' if path.endswith('.csv') else 'ndjson')
+
+
+def export_rows(queryset, chunk_size):
+    '''Записи постов в порядке (pub_date, id) без загрузки всей выборки'''
+    rows = queryset.order_by('pub_date', 'pk').values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        record = dict(zip(FIELDS, row))
+        record['group'] = record['group'] or ''
+        record['pub_date'] = record['pub_date'].isoformat()
+        yield record
+
+
+def export_comments(queryset, chunk_size):
+    '''Записи комментариев в порядке (created, id)'''
+    rows = queryset.order_by('created', 'pk').values_list(
+        'post_id', 'author__username', 'text', 'created'
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        record = dict(zip(COMMENT_FIELDS, row))
+        record['created'] = record['created'].isoformat()
+        yield record
+
+
+def export_follows(queryset, chunk_size):
+    '''Записи подписок: username подписчика и автора'''
+    rows = queryset.order_by('pk').values_list(
+        'user__username', 'author__username'
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(FOLLOW_FIELDS, row))
+
+
+def write_records(stream, records, fmt, fields=FIELDS):
+    '''Пишет записи в поток, возвращает их количество'''
+    total = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            total += 1
+        return total
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        total += 1
+    return total
+
+
+def read_records(stream, fmt):
+    '''Читает записи из потока по одной'''
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_date(value):
+    '''Дата публикации из записи, наивная считается локальной'''
+    date = parse_datetime(value or '')
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def copy_images(names, copy, workers):
+    '''Копирует файлы параллельно, возвращает новые имена по старым'''
+    names = sorted({name for name in names if name})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(names, pool.map(copy, names)))
+
+
+def import_image(source):
+    '''Функция копирования картинки из каталога source в хранилище'''
+    def copy(name):
+        with open(os.path.join(source, name), 'rb') as file:
+            return default_storage.save(name, File(file))
+    return copy
+
+
+def export_image(target):
+    '''Функция копирования картинки из хранилища в каталог target'''
+    def copy(name):
+        path = os.path.join(target, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with default_storage.open(name) as src, open(path, 'wb') as dst:
+            for chunk in src.chunks():
+                dst.write(chunk)
+        return name
+    return copy
+
+
+def save_batch(model, objects, batch_size):
+    '''bulk_create одной транзакцией, объектам проставляются pk.
+
+    PostgreSQL возвращает pk из INSERT ... RETURNING. SQLite их не
+    возвращает, но держит блокировку записи до конца транзакции,
+    поэтому последние len(objects) строк таблицы - наши.'''
+    with transaction.atomic():
+        model.objects.bulk_create(objects, batch_size=batch_size)
+        if objects and objects[0].pk is None:
+            pks = model.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objects)]
+            for obj, pk in zip(objects, reversed(list(pks))):
+                obj.pk = pk
+    return objects
+
+
+def index_posts(posts):
+    '''Поисковый индекс и копии картинок записанной пачки постов'''
+    SearchEntry.objects.bulk_create(
+        [entry for post in posts for entry in post_entries(post)]
+    )
+    for post in posts:
+        if post.image:
+            schedule_renditions(post.pk)
+
+
+def index_comments(comments):
+    '''Поисковый индекс записанной пачки комментариев'''
+    SearchEntry.objects.bulk_create(
+        [entry for comment in comments for entry in comment_entries(comment)]
+    )
+
+
+def follows_imported(pairs):
+    '''Счётчики, ленты и кэш подписок для записанных пар
+    (подписчик, автор)'''
+    followers = Counter(author_id for _, author_id in pairs)
+    following = Counter(user_id for user_id, _ in pairs)
+    for author_id, count in followers.items():
+        bump(author_id, 'followers_count', count)
+    for user_id, count in following.items():
+        bump(user_id, 'following_count', count)
+    for user_id, author_id in pairs:
+        backfill_feed(user_id, author_id)
+    for user_id in following:
+        invalidate_following(user_id)
+        bump_follow_generation(user_id)
+
+
+def rebuild_imported(posts, comments, chunk_size):
+    '''Счётчики авторов по числу загруженных постов posts
+    и комментариев comments, ленты подписчиков авторов постов'''
+    for author_id, count in posts.items():
+        bump(author_id, 'posts_count', count)
+    for author_id, count in comments.items():
+        bump(author_id, 'comments_count', count)
+    authors = list(posts)
+    for start in range(0, len(authors), chunk_size):
+        follows = Follow.objects.filter(
+            author_id__in=authors[start:start + chunk_size]
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in follows:
+            backfill_feed(user_id, author_id)
+    bump_feed_generation()
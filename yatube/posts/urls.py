@@ -15,11 +15,21 @@ urlpatterns = [
         views.groups_posts,
         name='group_list',
     ),
+    path(
+        'group/<slug:slug>/archive/',
+        views.group_archive,
+        name='group_archive',
+    ),
     path(
         'profile/<str:username>/',
         views.profile,
         name='profile',
     ),
+    path(
+        'profile/<str:username>/archive/',
+        views.profile_archive,
+        name='profile_archive',
+    ),
     path(
         'posts/<int:post_id>/',
         views.post_detail,
@@ -55,4 +65,9 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow',
     ),
+    path(
+        'search/',
+        views.search,
+        name='search',
+    ),
 ]
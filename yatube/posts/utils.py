@@ -1,12 +1,210 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
 
-from .constants import LIMIT_COUNTS_POSTS
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
+from core.cache import get_or_refresh
 
-def pagination(posts, request):
-    '''функция для навигации по сайту'''
-    paginator = Paginator(posts, LIMIT_COUNTS_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+from .constants import CACHE_UPDATE, CURSOR_PARAM, LIMIT_COUNTS_POSTS
+
+FEED_PAGE_KEY = 'feed_page:{}:{}'
+
+
+def batches(items, size):
+    '''Элементы пачками по size штук'''
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_cursor(post, reverse=False):
+    '''Кодирует позицию (pub_date, id) в непрозрачный токен'''
+    direction = 'p' if reverse else 'n'
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    '''Разбирает токен курсора, для битого токена возвращает None'''
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in ('n', 'p') or pub_date is None:
+        return None
+    return direction == 'p', pub_date, pk
+
+
+def keyset(rows, position, key='pk'):
+    '''Строки rows за позицией курсора в порядке листания.
+
+    key - поле id поста в rows, второй компонент ключа (pub_date, id).'''
+    if position is None:
+        return rows.order_by('-pub_date', f'-{key}')
+    reverse, pub_date, pk = position
+    if reverse:
+        return rows.filter(
+            Q(pub_date__gt=pub_date)
+            | Q(pub_date=pub_date, **{f'{key}__gt': pk})
+        ).order_by('pub_date', key)
+    return rows.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f'{key}__lt': pk})
+    ).order_by('-pub_date', f'-{key}')
+
+
+def approximate_count(queryset):
+    '''Приблизительное количество записей без полного COUNT(*).
+
+    Для нефильтрованной таблицы в PostgreSQL берём оценку планировщика,
+    во всех остальных случаях считаем честно.'''
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return queryset.count()
+
+
+class CursorPaginator(Paginator):
+    '''Пагинатор по ключу (pub_date, id) вместо LIMIT/OFFSET.
+
+    Страница выбирается курсором из ?cursor=, COUNT(*) выполняется
+    только если запрошено приблизительное общее количество (with_count).'''
+
+    cursor_based = True
+    ordering = ('-pub_date', '-pk')
+
+    def __init__(self, object_list, per_page, with_count=False, **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+        self.with_count = with_count
+        self.has_next_page = False
+        self.has_previous_page = False
+
+    @cached_property
+    def count(self):
+        '''Общее количество неизвестно, пока его не попросили явно'''
+        if self.with_count:
+            return approximate_count(self.object_list)
+        return None
+
+    @property
+    def num_pages(self):
+        '''Известны только соседние страницы относительно текущей'''
+        return 1 + self.has_previous_page + self.has_next_page
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def page(self, number):
+        '''Номер есть только у первой страницы, остальные открываются
+        курсором через get_page()'''
+        if str(number) != '1':
+            raise InvalidPage(
+                'Курсорная лента открывается по ?cursor=, а не по номеру'
+            )
+        return self.get_page(None)
+
+    def get_page(self, cursor):
+        return self.make_page(*self.fetch(cursor))
+
+    def window(self, position, limit):
+        '''Первые limit постов за позицией курсора в порядке листания'''
+        return list(keyset(self.object_list, position)[:limit])
+
+    def fetch(self, cursor):
+        '''Посты страницы и наличие соседних страниц'''
+        reverse = False
+        has_previous = has_next = False
+        position = decode_cursor(cursor)
+        if position is not None:
+            reverse = position[0]
+            has_next, has_previous = reverse, not reverse
+
+        items = self.window(position, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if reverse:
+            items.reverse()
+            has_previous = has_more
+        else:
+            has_next = has_more
+        if not items:
+            # курсор за краем ленты: соседних страниц для ссылок нет
+            has_previous = has_next = False
+        return items, has_previous, has_next
+
+    def make_page(self, items, has_previous, has_next):
+        '''Страница из результата fetch(), в том числе взятого из кэша'''
+        self.has_previous_page = has_previous
+        self.has_next_page = has_next
+        page = Page(items, 1 + self.has_previous_page, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if items and self.has_next_page:
+            page.next_cursor = encode_cursor(items[-1])
+        if items and self.has_previous_page:
+            page.previous_cursor = encode_cursor(items[0], reverse=True)
+
+        return page
+
+
+def pagination(posts, request, with_count=False, paginator=None):
+    '''функция для навигации по сайту
+
+    По умолчанию листает ленту курсором ?cursor= (пагинатором
+    paginator, если он передан), старые ссылки вида ?page=N
+    продолжают обслуживаться обычным Paginator.'''
+    if 'page' in request.GET and CURSOR_PARAM not in request.GET:
+        paginator = Paginator(posts, LIMIT_COUNTS_POSTS)
+        return paginator.get_page(request.GET.get('page'))
+
+    if paginator is None:
+        paginator = CursorPaginator(posts, LIMIT_COUNTS_POSTS, with_count)
+    page_obj = paginator.get_page(request.GET.get(CURSOR_PARAM))
 
     return page_obj
+
+
+def cached_pagination(posts, request, name, version):
+    '''pagination() со страницей ленты в кэше.
+
+    Страница пересчитывается одним процессом, когда истекает её время
+    жизни или меняется версия ленты version, остальные запросы в это
+    время получают предыдущую страницу.'''
+    if 'page' in request.GET and CURSOR_PARAM not in request.GET:
+        return pagination(posts, request)
+
+    cursor = request.GET.get(CURSOR_PARAM)
+    if decode_cursor(cursor) is None:
+        cursor = None
+    paginator = CursorPaginator(posts, LIMIT_COUNTS_POSTS)
+    state = get_or_refresh(
+        FEED_PAGE_KEY.format(name, cursor or ''),
+        lambda: paginator.fetch(cursor),
+        CACHE_UPDATE,
+        version=version,
+    )
+    return paginator.make_page(*state)
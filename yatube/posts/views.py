@@ -1,72 +1,120 @@
-from django.views.decorators.cache import cache_page
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import redirect, render
 from django.contrib.auth.decorators import login_required
 
-from .models import Follow, Post, Group, User
-from .utils import pagination
+from .archive import archive_response
+from .models import Comment, Follow, Post
+from .utils import cached_pagination, pagination
+from .feed import FollowFeedPaginator, follow_feed
+from .stats import get_user_stats
 from posts.forms import PostForm, CommentForm
-from .constants import CACHE_UPDATE
-
-
-@cache_page(CACHE_UPDATE, key_prefix='index_page')
+from .cache import feed_cache_context, post_cache
+from .constants import CURSOR_PARAM, LIMIT_COUNTS_POSTS
+from .search import search_posts
+from .suggestions import suggested_authors
+from core.objectcache import get_cached_or_404
+from .freshness import (
+    all_posts,
+    author_posts,
+    conditional,
+    feed_condition,
+    group_posts,
+    is_following,
+    load_author,
+    load_group,
+    load_post,
+    post_with_comments,
+    profile_viewer_state,
+    viewer_cache_control,
+    viewer_state,
+)
+
+
+@viewer_cache_control
+@feed_condition(all_posts, viewer_state)
 def index(request):
     '''view-функция для главной страницы'''
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = pagination(post_list, request)
+    post_list = Post.objects.for_feed()
+    cache_context = feed_cache_context()
+    page_obj = cached_pagination(
+        post_list, request, 'index', cache_context['feed_version']
+    )
     context = {
         'page_obj': page_obj,
-        'cache_updates': CACHE_UPDATE,
+        **cache_context,
     }
 
     return render(request, template, context)
 
 
+@viewer_cache_control
+@feed_condition(group_posts, viewer_state)
 def groups_posts(request, slug):
     '''view-функция для страницы на которой будут посты'''
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = load_group(request, slug)
+    posts = group.posts.for_feed()
     page_obj = pagination(posts, request)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache_context(),
     }
 
     return render(request, template, context)
 
 
+@viewer_cache_control
+@feed_condition(author_posts, profile_viewer_state)
 def profile(request, username):
     '''Страница профайла пользователя:
     на ней будет отображаться информация об авторе и его посты.'''
     temmplate = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts_list = author.posts.all()
+    author = load_author(request, username)
+    posts_list = author.posts.for_feed()
     page_obj = pagination(posts_list, request)
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(
-            user=request.user,
-            author=author,
-        ).exists()
-    )
+    following = is_following(request, username)
     context = {
         'author': author,
+        'stats': get_user_stats(author),
         'page_obj': page_obj,
         'following': following,
+        'suggestions': suggested_authors(request),
+        **feed_cache_context(),
     }
 
     return render(request, temmplate, context)
 
 
+@viewer_cache_control
+@feed_condition(group_posts, viewer_state)
+def group_archive(request, slug):
+    '''Все посты сообщества одной страницей'''
+    group = load_group(request, slug)
+    return archive_response(request, group.posts.for_feed(), {'group': group})
+
+
+@viewer_cache_control
+@feed_condition(author_posts, viewer_state)
+def profile_archive(request, username):
+    '''Все посты пользователя одной страницей'''
+    author = load_author(request, username)
+    return archive_response(
+        request, author.posts.for_feed(), {'author': author}
+    )
+
+
+@viewer_cache_control
+@conditional(post_with_comments, viewer_state)
 def post_detail(request, post_id):
     '''Страница для просмотра отдельного поста.'''
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = load_post(request, post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = Comment.objects.for_detail().filter(post_id=post.pk)
     context = {
         'post': post,
+        'stats': get_user_stats(post.author),
         'comments': comments,
         'form': form,
     }
@@ -94,9 +142,11 @@ def post_create(request):
 def edit(request, post_id):
     """Вью-функция изменения публикации"""
     template = 'posts:post_detail'
-    post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    post = get_cached_or_404(post_cache, pk=post_id)
+    if post.author_id != request.user.id:
         return redirect(template, post_id=post_id)
+    if request.method == 'POST':
+        post.refresh_from_db()
 
     form = PostForm(
         request.POST or None,
@@ -119,7 +169,7 @@ def edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_cached_or_404(post_cache, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -133,10 +183,15 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagination(post_list, request)
+    post_list = follow_feed(request.user).for_feed()
+    page_obj = pagination(
+        post_list,
+        request,
+        paginator=FollowFeedPaginator(request.user, LIMIT_COUNTS_POSTS),
+    )
     context = {
         'page_obj': page_obj,
+        **feed_cache_context(request.user),
     }
 
     return render(request, template, context)
@@ -144,7 +199,7 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = load_author(request, username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
 
@@ -153,7 +208,23 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = load_author(request, username)
     Follow.objects.filter(user=request.user, author=author).delete()
 
     return redirect('posts:profile', username=username)
+
+
+def search(request):
+    '''Поиск по постам и комментариям'''
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = search_posts(
+        query, request.GET.get(CURSOR_PARAM), LIMIT_COUNTS_POSTS
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        **feed_cache_context(),
+    }
+
+    return render(request, template, context)
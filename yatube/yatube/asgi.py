@@ -0,0 +1,28 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no native ASGI handler and no async views, so the WSGI
+application is wrapped with ``asgiref.wsgi.WsgiToAsgi``. This is only a
+compatibility entry point for ASGI servers, not an async deployment: a
+request holds a thread for its whole lifetime, including sending the
+response body to the client.
+
+asgiref >= 3.3 runs the wrapped application with ``thread_sensitive=True``,
+so a process serves one request at a time. Concurrency comes from worker
+processes only::
+
+    uvicorn yatube.asgi:application --workers 8
+
+A threaded WSGI server (``yatube.wsgi``) handles more requests per process.
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(get_wsgi_application())
@@ -26,11 +26,14 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'about.apps.AboutConfig',
     'users.apps.UsersConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.PrimaryPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -42,18 +45,31 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+
+# TEMPLATE_CACHE=1 - шаблоны и их include компилируются один раз
+# на процесс (cached loader), по умолчанию включено без DEBUG.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if os.getenv('TEMPLATE_CACHE', '0' if DEBUG else '1') == '1':
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.instrumentation.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.follow_graph',
             ],
         },
     },
@@ -62,12 +78,58 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# DB_ENGINE=postgresql включает PostgreSQL с постоянными соединениями.
+# DB_PGBOUNCER=1 - соединения идут через пул PgBouncer в режиме
+# transaction, серверные курсоры для него отключаются.
+# DB_REPLICA_HOSTS=host1,host2 - реплики для чтения лент,
+# DB_REPLICA=sqlite - имитация реплики вторым файлом SQLite
+# (данные на неё копирует manage.py sync_replica).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'yatube'),
+            'USER': os.environ.get('POSTGRES_USER', 'yatube'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'DISABLE_SERVER_SIDE_CURSORS': bool(
+                os.environ.get('DB_PGBOUNCER')
+            ),
+        }
     }
-}
+    for number, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1
+    ):
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+    if os.environ.get('DB_REPLICA') == 'sqlite':
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# SQLITE_TUNING=0 оставляет SQLite без WAL и прочих настроек
+# из core.constants.SQLITE_PRAGMAS.
+if os.environ.get('SQLITE_TUNING') == '0':
+    SQLITE_PRAGMAS = {}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -104,14 +166,55 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# EMAIL_QUEUE=1 - письма ставятся в очередь задач и отправляются
+# воркером manage.py runworker, по умолчанию включено без DEBUG.
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = QUEUED_EMAIL_BACKEND
+if os.getenv('EMAIL_QUEUE', '0' if DEBUG else '1') == '1':
+    EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# CACHE_BACKEND выбирает общий для всех процессов кэш:
+# file - каталог CACHE_LOCATION, sqlite - отдельный файл cache.sqlite3
+# (таблицу создаёт manage.py createcachetable --database cache),
+# redis и memcached требуют django-redis и python-memcached.
+# locmem - кэш внутри процесса для разработки и тестов.
+# CACHE_VERSION меняет версию всех ключей, например при выкладке.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'core.cache_backends.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'sqlite': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_WRAPPED_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[CACHE_BACKEND]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.instrumentation.InstrumentedCache',
+        'WRAPPED_BACKEND': CACHE_WRAPPED_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': 'yatube',
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
     }
 }
+
+if CACHE_BACKEND == 'sqlite':
+    DATABASES['cache'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'cache.sqlite3'),
+    }
+
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 1.0)
+)
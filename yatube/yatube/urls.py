@@ -26,6 +26,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('internal/', include('core.urls', namespace='core')),
+    path('api/', include('api.urls', namespace='api')),
 ]
 
 if settings.DEBUG: